@@ -6,8 +6,10 @@ Run this after starting the infrastructure services.
 
 import asyncio
 import logging
+import re
 import sys
-import subprocess
+
+import httpx
 
 # Setup logging
 logging.basicConfig(
@@ -17,12 +19,13 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def check_services():
+OLLAMA_URL = "http://localhost:11434"
+
+
+async def check_services(client):
     """Check if required services are running."""
-    import httpx
-    
     services = {
-        "Ollama": "http://localhost:11434/",
+        "Ollama": "/",
         "Qdrant": "http://localhost:6333/healthz"
     }
     
@@ -30,7 +33,7 @@ def check_services():
     
     for service_name, url in services.items():
         try:
-            response = httpx.get(url, timeout=10.0)
+            response = await client.get(url, timeout=10.0)
             if response.status_code == 200:
                 logger.info(f"✓ {service_name} is running")
             else:
@@ -44,163 +47,99 @@ def check_services():
     return True
 
 
-def setup_ollama_model():
-    """Download and setup Ollama model."""
-    import httpx
-    import json
-    
-    logger.info("Setting up Ollama model...")
-    
-    model_name = "gpt-oss:20b"
-    
+async def _list_models(client, timeout: float = 30.0) -> set[str]:
+    """List the names of models installed in Ollama via the HTTP API."""
+    response = await client.get("/api/tags", timeout=timeout)
+    response.raise_for_status()
+    return {model.get("name", "") for model in response.json().get("models", [])}
+
+
+async def _pull_model(client, model_name: str, installed: set[str], timeout: float) -> bool:
+    """Download an Ollama model if it is not already in the installed set."""
     try:
-        # Check if model exists via HTTP API
-        logger.info("Checking if model exists...")
-        response = httpx.get("http://localhost:11434/api/tags", timeout=30.0)
-        
-        if response.status_code == 200:
-            models_data = response.json()
-            existing_models = [model.get("name", "") for model in models_data.get("models", [])]
-            
-            # Check if our model is already available
-            model_exists = any(model_name in model for model in existing_models)
+        # Check if our model is already available
+        if any(model_name in model for model in installed):
+            logger.info(f"✓ Model {model_name} already exists")
+            return True
             
-            if model_exists:
-                logger.info(f"✓ Model {model_name} already exists")
-                return True
-                
-            logger.info(f"Model {model_name} not found. Available models: {existing_models}")
-        else:
-            logger.warning(f"Could not check existing models (HTTP {response.status_code})")
+        logger.info(f"Model {model_name} not found. Available models: {sorted(installed)}")
             
         # Pull model using local Ollama
         logger.info(f"Downloading model {model_name} via local Ollama... (this may take several minutes)")
-        logger.info("This will download several GB of data, please be patient...")
         
-        result = subprocess.run([
-            "ollama", "pull", model_name
-        ], timeout=3600)  # 60 minutes timeout for large model
+        proc = await asyncio.create_subprocess_exec(
+            "ollama", "pull", model_name,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT
+        )
         
-        if result.returncode == 0:
+        async def _stream_output():
+            # Log progress line by line so concurrent pulls stay readable.
+            # Progress bars redraw with carriage returns, so split on those too
+            # and skip repeated lines.
+            buffer = b""
+            last_line = ""
+            while chunk := await proc.stdout.read(4096):
+                *lines, buffer = re.split(rb"[\r\n]", buffer + chunk)
+                for line in lines:
+                    text = line.decode(errors="replace").strip()
+                    if text and text != last_line:
+                        logger.info(f"[{model_name}] {text}")
+                        last_line = text
+            return await proc.wait()
+        
+        try:
+            returncode = await asyncio.wait_for(_stream_output(), timeout=timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            logger.error(f"✗ Ollama download of {model_name} timed out (this can happen with large models)")
+            logger.error("  You can continue the download manually with:")
+            logger.error(f"  ollama pull {model_name}")
+            return False
+        
+        if returncode == 0:
             logger.info(f"✓ Model {model_name} downloaded successfully")
             
-            # Verify the model was downloaded
+            # Verify the model was downloaded (only re-query after an actual pull)
             try:
-                response = httpx.get("http://localhost:11434/api/tags", timeout=10.0)
-                if response.status_code == 200:
-                    models_data = response.json()
-                    existing_models = [model.get("name", "") for model in models_data.get("models", [])]
-                    model_exists = any(model_name in model for model in existing_models)
-                    
-                    if model_exists:
-                        logger.info(f"✓ Verified model {model_name} is now available")
-                        return True
-                    else:
-                        logger.warning(f"Model download completed but {model_name} not found in model list")
-                        return False
-                        
+                existing_models = await _list_models(client, timeout=10.0)
             except Exception as e:
                 logger.warning(f"Could not verify model download: {e}")
-                return True  # Assume success if docker command succeeded
+                return True  # Assume success if ollama command succeeded
             
-            return True
+            if any(model_name in model for model in existing_models):
+                logger.info(f"✓ Verified model {model_name} is now available")
+                return True
+            else:
+                logger.warning(f"Model download completed but {model_name} not found in model list")
+                return False
         else:
             logger.error(f"✗ Failed to download model {model_name}")
             return False
             
-    except subprocess.TimeoutExpired:
-        logger.error("✗ Ollama model download timed out (this can happen with large models)")
-        logger.error("  You can continue the download manually with:")
-        logger.error(f"  ollama pull {model_name}")
-        return False
     except FileNotFoundError:
         logger.error("✗ Ollama CLI not found. Please install Ollama first:")
         logger.error("  https://ollama.com/download")
         return False
     except Exception as e:
-        logger.error(f"✗ Failed to setup Ollama model: {e}")
+        logger.error(f"✗ Failed to setup Ollama model {model_name}: {e}")
         logger.error(f"  You can try manually with:")
         logger.error(f"  ollama pull {model_name}")
         return False
 
 
-def setup_ollama_embedding_model():
+async def setup_ollama_model(client, installed: set[str]):
+    """Download and setup Ollama model."""
+    logger.info("Setting up Ollama model...")
+    logger.info("This will download several GB of data, please be patient...")
+    return await _pull_model(client, "gpt-oss:20b", installed, timeout=3600)  # 60 minutes timeout for large model
+
+
+async def setup_ollama_embedding_model(client, installed: set[str]):
     """Download and setup Ollama embedding model."""
-    import httpx
-    import json
-    
     logger.info("Setting up Ollama embedding model...")
-    
-    embedding_model_name = "all-minilm"
-    
-    try:
-        # Check if embedding model exists via HTTP API
-        logger.info("Checking if embedding model exists...")
-        response = httpx.get("http://localhost:11434/api/tags", timeout=30.0)
-        
-        if response.status_code == 200:
-            models_data = response.json()
-            existing_models = [model.get("name", "") for model in models_data.get("models", [])]
-            
-            # Check if our embedding model is already available
-            model_exists = any(embedding_model_name in model for model in existing_models)
-            
-            if model_exists:
-                logger.info(f"✓ Embedding model {embedding_model_name} already exists")
-                return True
-                
-            logger.info(f"Embedding model {embedding_model_name} not found. Available models: {existing_models}")
-        else:
-            logger.warning(f"Could not check existing models (HTTP {response.status_code})")
-            
-        # Pull embedding model using local Ollama
-        logger.info(f"Downloading embedding model {embedding_model_name}... (this may take a few minutes)")
-        
-        result = subprocess.run([
-            "ollama", "pull", embedding_model_name
-        ], timeout=1800)  # 30 minutes timeout for embedding model
-        
-        if result.returncode == 0:
-            logger.info(f"✓ Embedding model {embedding_model_name} downloaded successfully")
-            
-            # Verify the model was downloaded
-            try:
-                response = httpx.get("http://localhost:11434/api/tags", timeout=10.0)
-                if response.status_code == 200:
-                    models_data = response.json()
-                    existing_models = [model.get("name", "") for model in models_data.get("models", [])]
-                    model_exists = any(embedding_model_name in model for model in existing_models)
-                    
-                    if model_exists:
-                        logger.info(f"✓ Verified embedding model {embedding_model_name} is now available")
-                        return True
-                    else:
-                        logger.warning(f"Embedding model download completed but {embedding_model_name} not found in model list")
-                        return False
-                        
-            except Exception as e:
-                logger.warning(f"Could not verify embedding model download: {e}")
-                return True  # Assume success if ollama command succeeded
-            
-            return True
-        else:
-            logger.error(f"✗ Failed to download embedding model {embedding_model_name}")
-            return False
-            
-    except subprocess.TimeoutExpired:
-        logger.error("✗ Ollama embedding model download timed out")
-        logger.error("  You can continue the download manually with:")
-        logger.error(f"  ollama pull {embedding_model_name}")
-        return False
-    except FileNotFoundError:
-        logger.error("✗ Ollama CLI not found. Please install Ollama first:")
-        logger.error("  https://ollama.com/download")
-        return False
-    except Exception as e:
-        logger.error(f"✗ Failed to setup Ollama embedding model: {e}")
-        logger.error(f"  You can try manually with:")
-        logger.error(f"  ollama pull {embedding_model_name}")
-        return False
+    return await _pull_model(client, "all-minilm", installed, timeout=1800)  # 30 minutes timeout for embedding model
 
 
 async def setup_vector_store():
@@ -209,52 +148,55 @@ async def setup_vector_store():
     
     try:
         # Import here to avoid issues if packages aren't installed yet
-        from src.mcp_aws_yolo.vector_store import get_vector_store_for_setup
+        from src.mcp_aws_yolo.vector_store import create_qdrant_client, get_vector_store_for_setup
         from src.mcp_aws_yolo.registry import MCPServerRegistry
         from src.mcp_aws_yolo.config import config
         
         # Initialize vector store with fresh collection
         logger.info("Initializing vector store...")
         
-        # First, delete existing collection if it exists
+        # One client is shared by every setup phase and closed once at the end
+        qdrant_client = create_qdrant_client()
+        
         try:
-            from qdrant_client import AsyncQdrantClient
-            qdrant_client = AsyncQdrantClient(url=config.qdrant_url, api_key=config.qdrant_api_key)
+            # First, delete existing collection if it exists
+            try:
+                collections = await qdrant_client.get_collections()
+                collection_exists = any(
+                    collection.name == config.vector_collection_name 
+                    for collection in collections.collections
+                )
+                
+                if collection_exists:
+                    await qdrant_client.delete_collection(config.vector_collection_name)
+                    logger.info(f"Deleted existing collection: {config.vector_collection_name}")
+            except Exception as e:
+                logger.warning(f"Could not delete existing collection: {e}")
             
-            # Check if collection exists and delete it
-            collections = await qdrant_client.get_collections()
-            collection_exists = any(
-                collection.name == config.vector_collection_name 
-                for collection in collections.collections
+            # Load MCP server registry
+            logger.info("Loading MCP server registry...")
+            registry = MCPServerRegistry(config.mcp_registry_file)
+            await registry.load_registry()
+            
+            # Now initialize vector store (will create fresh collection sized for the registry)
+            vector_store = await get_vector_store_for_setup(
+                client=qdrant_client,
+                vector_count_hint=len(registry.servers)
             )
             
-            if collection_exists:
-                await qdrant_client.delete_collection(config.vector_collection_name)
-                logger.info(f"Deleted existing collection: {config.vector_collection_name}")
+            # Index servers in vector store
+            logger.info("Indexing MCP servers in vector store...")
+            await registry.index_all_servers()
+            
+            # Get collection info
+            collection_info = await vector_store.get_collection_info()
+            logger.info(f"✓ Vector store setup complete:")
+            logger.info(f"  - Points: {collection_info.get('points_count', 'unknown')}")
+            logger.info(f"  - Vectors: {collection_info.get('vectors_count', 'unknown')}")
             
+            return True
+        finally:
             await qdrant_client.close()
-        except Exception as e:
-            logger.warning(f"Could not delete existing collection: {e}")
-        
-        # Now initialize vector store (will create fresh collection)
-        vector_store = await get_vector_store_for_setup()
-        
-        # Load MCP server registry
-        logger.info("Loading MCP server registry...")
-        registry = MCPServerRegistry(config.mcp_registry_file)
-        await registry.load_registry()
-        
-        # Index servers in vector store
-        logger.info("Indexing MCP servers in vector store...")
-        await registry.index_all_servers()
-        
-        # Get collection info
-        collection_info = await vector_store.get_collection_info()
-        logger.info(f"✓ Vector store setup complete:")
-        logger.info(f"  - Points: {collection_info.get('points_count', 'unknown')}")
-        logger.info(f"  - Vectors: {collection_info.get('vectors_count', 'unknown')}")
-        
-        return True
         
     except ImportError as e:
         logger.error(f"✗ Missing dependencies: {e}")
@@ -269,28 +211,75 @@ async def setup_vector_store():
         return False
 
 
+async def _run_all():
+    """Check services, then run the independent setup phases concurrently.
+    
+    Returns None if the required services are not running.
+    """
+    # One pooled client for every probe so connections are reused
+    async with httpx.AsyncClient(
+        base_url=OLLAMA_URL,
+        timeout=30.0,
+        limits=httpx.Limits(max_keepalive_connections=4, keepalive_expiry=60)
+    ) as client:
+        if not await check_services(client):
+            return None
+        
+        # Fetch the model list once and share it between both model setups
+        logger.info("Checking installed Ollama models...")
+        try:
+            installed = await _list_models(client)
+        except Exception as e:
+            logger.warning(f"Could not check existing models: {e}")
+            installed = set()
+        
+        async def _embedding_then_vector_store():
+            # Indexing needs the embedding model, so only this pair is ordered
+            emb_ok = await setup_ollama_embedding_model(client, installed)
+            vs_ok = await setup_vector_store() if emb_ok else False
+            return emb_ok, vs_ok
+        
+        llm_ok, embedding_result = await asyncio.gather(
+            setup_ollama_model(client, installed),
+            _embedding_then_vector_store(),
+            return_exceptions=True
+        )
+    
+    if isinstance(embedding_result, BaseException):
+        logger.error(f"✗ Embedding/vector store setup raised: {embedding_result}")
+        emb_ok, vs_ok = embedding_result, embedding_result
+    else:
+        emb_ok, vs_ok = embedding_result
+    
+    if isinstance(llm_ok, BaseException):
+        logger.error(f"✗ Ollama model setup raised: {llm_ok}")
+    
+    return llm_ok, emb_ok, vs_ok
+
+
 def main():
     """Main setup function."""
     logger.info("🚀 Starting MCP AWS YOLO setup...")
     
-    # Check if services are running
-    if not check_services():
+    # Check services, then setup Ollama models and vector store concurrently
+    results = asyncio.run(_run_all())
+    
+    if results is None:
         logger.error("❌ Setup failed: Required services are not running")
         logger.info("Please start services with: docker-compose up -d")
         sys.exit(1)
     
-    # Setup Ollama models
-    if not setup_ollama_model():
+    llm_ok, emb_ok, vs_ok = results
+    
+    if llm_ok is not True:
         logger.error("❌ Setup failed: Could not setup Ollama LLM model")
         sys.exit(1)
     
-    if not setup_ollama_embedding_model():
+    if emb_ok is not True:
         logger.error("❌ Setup failed: Could not setup Ollama embedding model")
         sys.exit(1)
     
-    # Setup vector store (async)
-    success = asyncio.run(setup_vector_store())
-    if not success:
+    if vs_ok is not True:
         logger.error("❌ Setup failed: Could not setup vector store")
         sys.exit(1)
     
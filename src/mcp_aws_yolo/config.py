@@ -12,30 +12,72 @@ class MCPAWSYoloConfig(BaseSettings):
     # Server configuration
     server_name: str = Field(default="MCP AWS YOLO", description="MCP server name")
     log_level: str = Field(default="INFO", description="Logging level")
+    health_timeout: float = Field(default=30.0, description="Seconds allowed per health check probe")
     
     # LLM configuration
     llm_model: str = Field(default="ollama/gpt-oss:20b", description="LLM model for analysis")
     llm_base_url: str = Field(default="http://localhost:11434", description="LLM API base URL")
     llm_api_key: Optional[str] = Field(default=None, description="LLM API key if required")
+    llm_cache_size: int = Field(default=512, description="Max cached LLM responses (0 disables caching)")
+    llm_concurrency: int = Field(default=2, description="Max in-flight LLM requests")
+    llm_max_attempts: int = Field(default=3, description="Attempts per LLM request on transient errors")
     
     # Vector store configuration
     qdrant_url: str = Field(default="http://localhost:6333", description="Qdrant vector store URL")
     qdrant_api_key: Optional[str] = Field(default=None, description="Qdrant API key")
+    qdrant_prefer_grpc: bool = Field(default=True, description="Use Qdrant gRPC transport when available")
+    qdrant_grpc_port: int = Field(default=6334, description="Qdrant gRPC port")
     vector_collection_name: str = Field(default="mcp_servers", description="Vector collection name")
     embedding_model: str = Field(default="all-minilm", description="Ollama embedding model")
+    embedding_max_connections: int = Field(default=64, description="Max pooled HTTP connections to Ollama for embeddings")
+    embedding_dim_cache_file: str = Field(default="embedding_dim_cache.json", description="Known embedding dimension per model, skips the startup probe")
+    embedding_cache_file: str = Field(default="embedding_cache.json", description="Server embedding cache file reused across indexing runs")
     
     # MCP server registry
     mcp_registry_file: str = Field(default="mcp_registry.json", description="MCP server registry file")
+    tools_cache_ttl: float = Field(default=300.0, description="Seconds to cache each server's tool list")
+    max_concurrent_mcp: int = Field(default=8, description="Max MCP server subprocesses starting at once")
+    pool_size_per_server: int = Field(default=4, description="Max pooled MCP sessions kept open per server")
+    index_concurrency: int = Field(default=16, description="Max concurrent embedding requests while indexing")
+    embed_token_budget: int = Field(default=32000, description="Approximate characters of server text per embedding batch")
+    embed_max_batch: int = Field(default=64, description="Max servers per embedding batch and upsert")
     
     # Search and routing parameters
     search_limit: int = Field(default=5, description="Vector search result limit")
+    query_cache_size: int = Field(default=1024, description="Max cached search query embeddings (0 disables caching)")
+    hnsw_ef: int = Field(default=0, description="HNSW ef at query time; 0 picks max(64, 4 * limit)")
     similarity_threshold: float = Field(default=0.3, description="Similarity score threshold")
     confidence_threshold: float = Field(default=0.5, description="Confidence threshold for routing")
+    selection_margin: float = Field(default=0.2, description="Score gap over the runner-up that skips LLM selection")
+    min_prompt_tokens: int = Field(default=2, description="Minimum words in a prompt before it is analyzed")
+    intention_cache_size: int = Field(default=512, description="Max cached get_intention results (0 disables caching)")
+    intention_cache_ttl: float = Field(default=60.0, description="Seconds to reuse a cached get_intention result")
     
     class Config:
         env_prefix = "MCP_AWS_YOLO_"
         env_file = ".env"
 
 
-# Global configuration instance
-config = MCPAWSYoloConfig()
\ No newline at end of file
+# Global configuration instance, parsed from the environment on first use
+_config: Optional[MCPAWSYoloConfig] = None
+
+
+def get_config() -> MCPAWSYoloConfig:
+    """Get or create global configuration instance."""
+    global _config
+    if _config is None:
+        _config = MCPAWSYoloConfig()
+    return _config
+
+
+class _LazyConfig:
+    """Proxy that defers settings parsing until an attribute is read."""
+    
+    def __getattr__(self, name: str) -> Any:
+        return getattr(get_config(), name)
+    
+    def __setattr__(self, name: str, value: Any):
+        setattr(get_config(), name, value)
+
+
+config: MCPAWSYoloConfig = _LazyConfig()  # type: ignore[assignment]
\ No newline at end of file
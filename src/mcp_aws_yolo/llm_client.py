@@ -1,17 +1,79 @@
 """LLM client for intent analysis and server selection."""
 
+import asyncio
+import copy
+import hashlib
 import logging
-from typing import Dict, List, Any, Optional
+import random
+import re
+from collections import OrderedDict
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Any, Optional
 import json
 
-import litellm
-from litellm import acompletion
-
 from .config import config
-from .vector_store import MCPServerCandidate
+
+if TYPE_CHECKING:
+    from .vector_store import MCPServerCandidate
 
 logger = logging.getLogger(__name__)
 
+# litellm is heavy to import, so it is loaded on the first LLM call
+_litellm = None
+
+
+def _get_litellm():
+    """Import litellm on first use."""
+    global _litellm
+    if _litellm is None:
+        import litellm
+        _litellm = litellm
+    return _litellm
+
+
+# Upper bound in seconds for the randomized exponential retry backoff
+LLM_RETRY_MAX_WAIT = 30.0
+
+# Bump when the system prompts change so stale cached responses are not reused
+PROMPT_CACHE_VERSION = 4
+
+# Output token caps; responses are JSON-constrained so these bound decode time
+INTENT_MAX_TOKENS = 256
+SELECTION_MAX_TOKENS = 96
+
+# Candidate descriptions are truncated to keep the selection prompt small
+CANDIDATE_DESCRIPTION_CHARS = 200
+
+# Compact JSON separators; indentation only adds prompt tokens
+_COMPACT_JSON = (",", ":")
+
+# Selection fields that must be complete before a streamed response can be
+# cut short. A value only counts once a delimiter follows it.
+_SELECTION_FIELD_PATTERNS = {
+    "selected_index": re.compile(r'"selected_index"\s*:\s*(-?\d+)\s*[,}]'),
+    "confidence": re.compile(r'"confidence"\s*:\s*(-?\d+(?:\.\d+)?)\s*[,}]'),
+    "recommended_tool": re.compile(r'"recommended_tool"\s*:\s*"((?:[^"\\]|\\.)*)"'),
+}
+
+
+def _parse_partial_selection(text: str) -> Optional[Dict[str, Any]]:
+    """Extract the selection fields from a possibly truncated JSON response.
+    
+    Returns None until selected_index, confidence and recommended_tool are
+    all complete.
+    """
+    matches = {}
+    for field, pattern in _SELECTION_FIELD_PATTERNS.items():
+        match = pattern.search(text)
+        if not match:
+            return None
+        matches[field] = match.group(1)
+    
+    return {
+        "selected_index": int(matches["selected_index"]),
+        "confidence": float(matches["confidence"]),
+        "recommended_tool": json.loads(f'"{matches["recommended_tool"]}"'),
+    }
+
 
 class LLMClient:
     """Client for LLM operations."""
@@ -20,6 +82,74 @@ class LLMClient:
         self.model = config.llm_model
         self.base_url = config.llm_base_url
         self.api_key = config.llm_api_key
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._cache_size = config.llm_cache_size
+        self._semaphore = asyncio.Semaphore(max(1, config.llm_concurrency))
+    
+    async def _acompletion_with_retry(self, **kwargs) -> Any:
+        """Call acompletion, retrying transient errors with jittered backoff."""
+        litellm = _get_litellm()
+        transient_errors = (litellm.APIConnectionError, litellm.Timeout)
+        max_attempts = max(1, config.llm_max_attempts)
+        
+        for attempt in range(1, max_attempts + 1):
+            try:
+                return await litellm.acompletion(
+                    model=self.model,
+                    base_url=self.base_url,
+                    api_key=self.api_key,
+                    **kwargs
+                )
+            except transient_errors as e:
+                if attempt == max_attempts:
+                    raise
+                delay = random.uniform(0, min(LLM_RETRY_MAX_WAIT, 2 ** attempt))
+                logger.warning(f"LLM request failed ({e}), retrying in {delay:.1f}s (attempt {attempt}/{max_attempts})")
+                await asyncio.sleep(delay)
+    
+    async def _complete(self, **kwargs) -> Any:
+        """Call acompletion with bounded concurrency."""
+        async with self._semaphore:
+            return await self._acompletion_with_retry(**kwargs)
+    
+    async def _stream_content(self, **kwargs) -> AsyncIterator[str]:
+        """Stream completion text, holding a concurrency slot until closed."""
+        async with self._semaphore:
+            response = await self._acompletion_with_retry(stream=True, **kwargs)
+            try:
+                async for chunk in response:
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        yield delta
+            finally:
+                close = getattr(response, "aclose", None)
+                if close is not None:
+                    await close()
+    
+    def _cache_key(self, *parts: str) -> str:
+        """Build a content hash key for the rendered request."""
+        hasher = hashlib.blake2b(digest_size=16)
+        for part in (str(PROMPT_CACHE_VERSION), self.model, *parts):
+            hasher.update(part.encode())
+            hasher.update(b"\0")
+        return hasher.hexdigest()
+    
+    def _cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of a cached response, marking it as recently used."""
+        cached = self._cache.get(key)
+        if cached is None:
+            return None
+        self._cache.move_to_end(key)
+        return copy.deepcopy(cached)
+    
+    def _cache_put(self, key: str, value: Dict[str, Any]):
+        """Store a parsed response, evicting the least recently used entry."""
+        if self._cache_size <= 0:
+            return
+        self._cache[key] = copy.deepcopy(value)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
         
     async def analyze_user_intent(self, prompt: str) -> Dict[str, Any]:
         """Analyze user prompt to extract intent and requirements."""
@@ -33,7 +163,7 @@ Given a user prompt, extract:
 4. Key parameters or constraints
 5. Urgency level
 
-Return a JSON object with these fields (NO ADDITIONAL FORMATTING, NO EXPLANATIONS, JUST JSON):
+Return a JSON object with these fields:
 - intent: string describing the main goal
 - capabilities: list of required capabilities
 - domain: string describing the domain/category
@@ -57,20 +187,27 @@ Response: {
 }
 """
         
+        cache_key = self._cache_key(system_prompt, prompt)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            logger.debug("Using cached intent analysis")
+            return cached
+        
         try:
-            response = await acompletion(
-                model=self.model,
+            response = await self._complete(
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": prompt}
                 ],
-                base_url=self.base_url,
-                api_key=self.api_key,
                 temperature=0.1,
+                max_tokens=INTENT_MAX_TOKENS,
+                response_format={"type": "json_object"},
             )
             
             content = response.choices[0].message.content
-            return json.loads(content)
+            intent = json.loads(content)
+            self._cache_put(cache_key, intent)
+            return intent
             
         except Exception as e:
             logger.error(f"LLM intent analysis failed: {e}")
@@ -84,45 +221,86 @@ Response: {
                 "keywords": prompt.split()[:5]
             }
     
+    async def _stream_selection(self, system_prompt: str) -> Dict[str, Any]:
+        """Stream the selection response and stop once the key fields arrive.
+        
+        Decoding is abandoned as soon as selected_index, confidence and
+        recommended_tool are complete, skipping any trailing tokens.
+        """
+        content = ""
+        stream = self._stream_content(
+            messages=[
+                {"role": "system", "content": system_prompt}
+            ],
+            temperature=0.1,
+            max_tokens=SELECTION_MAX_TOKENS,
+            response_format={"type": "json_object"},
+        )
+        try:
+            async for delta in stream:
+                content += delta
+                selection = _parse_partial_selection(content)
+                if selection is not None:
+                    logger.debug("Stopping selection stream early")
+                    return selection
+        finally:
+            await stream.aclose()
+        
+        try:
+            return json.loads(content)
+        except ValueError:
+            # Truncated by max_tokens; use whatever fields made it through
+            selection = _parse_partial_selection(content)
+            if selection is None:
+                raise
+            return selection
+    
     async def select_best_server(
         self, 
         user_intent: Dict[str, Any],
-        candidates: List[MCPServerCandidate],
+        candidates: List["MCPServerCandidate"],
         original_prompt: str
-    ) -> Optional[MCPServerCandidate]:
+    ) -> Optional["MCPServerCandidate"]:
         """Use LLM to select the best MCP server from candidates."""
         
         if not candidates:
             return None
+        
+        candidates = sorted(candidates, key=lambda c: c.similarity_score, reverse=True)
+        
+        # Skip the LLM when the vector search result is already decisive
+        top = candidates[0]
+        if top.similarity_score >= config.confidence_threshold and (
+            len(candidates) == 1
+            or top.similarity_score - candidates[1].similarity_score > config.selection_margin
+        ):
+            top.metadata["llm_confidence"] = top.similarity_score
+            top.metadata["recommended_tool"] = top.tools[0].get("name", "") if top.tools else ""
+            logger.info(f"Selected server by similarity: {top.server_id} (score: {top.similarity_score:.3f})")
+            return top
             
-        # Prepare candidate information for LLM
+        # Prepare a trimmed view of each candidate for the LLM; the full
+        # candidate objects are kept for post-selection bookkeeping
         candidates_info = []
         for i, candidate in enumerate(candidates):
-            tools_info = []
-            for tool in candidate.tools:
-                tools_info.append({
-                    "name": tool.get("name", ""),
-                    "description": tool.get("description", "")
-                })
-            
             candidates_info.append({
                 "index": i,
                 "server_id": candidate.server_id,
                 "name": candidate.name,
-                "description": candidate.description,
-                "similarity_score": candidate.similarity_score,
-                "tools": tools_info,
+                "description": candidate.description[:CANDIDATE_DESCRIPTION_CHARS],
+                "similarity_score": round(candidate.similarity_score, 3),
+                "tools": [tool.get("name", "") for tool in candidate.tools],
                 "capabilities": candidate.capabilities
             })
         
         system_prompt = f"""
 You are an AI assistant that selects the best MCP server for a user's request.
 
-User Intent Analysis: {json.dumps(user_intent, indent=2)}
+User Intent Analysis: {json.dumps(user_intent, separators=_COMPACT_JSON)}
 Original Prompt: "{original_prompt}"
 
 Available MCP Server Candidates:
-{json.dumps(candidates_info, indent=2)}
+{json.dumps(candidates_info, separators=_COMPACT_JSON)}
 
 Select the best server that matches the user's intent and requirements.
 Consider:
@@ -131,35 +309,28 @@ Consider:
 3. Server capabilities
 4. Similarity score
 
-Return a JSON object (NO ADDITIONAL FORMATTING, NO EXPLANATIONS, JUST JSON) with:
+Return a JSON object with exactly these fields, in this order:
 - selected_index: index of the best server (0-{len(candidates)-1})
 - confidence: confidence score 0.0-1.0
-- reasoning: explanation for the selection
 - recommended_tool: name of the most relevant tool to use
 
 If no server is suitable, return selected_index: -1
 """
         
         try:
-            response = await acompletion(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt}
-                ],
-                base_url=self.base_url,
-                api_key=self.api_key,
-                temperature=0.1,
-            )
-            
-            content = response.choices[0].message.content
-            selection = json.loads(content)
+            cache_key = self._cache_key(system_prompt)
+            selection = self._cache_get(cache_key)
+            if selection is not None:
+                logger.debug("Using cached server selection")
+            else:
+                selection = await self._stream_selection(system_prompt)
+                self._cache_put(cache_key, selection)
             
             selected_index = selection.get("selected_index", -1)
             if 0 <= selected_index < len(candidates):
                 selected_candidate = candidates[selected_index]
                 # Update confidence based on LLM assessment
                 selected_candidate.metadata["llm_confidence"] = selection.get("confidence", 0.5)
-                selected_candidate.metadata["llm_reasoning"] = selection.get("reasoning", "")
                 selected_candidate.metadata["recommended_tool"] = selection.get("recommended_tool", "")
                 
                 logger.info(f"LLM selected server: {selected_candidate.server_id} with confidence: {selection.get('confidence', 0.5)}")
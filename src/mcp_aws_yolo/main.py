@@ -1,20 +1,26 @@
 """Main MCP AWS YOLO server implementation."""
 
+import copy
+import hashlib
+import json
 import logging
 import asyncio
 import sys
 import time
-from typing import Dict, Any, Optional
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Any, Optional, Tuple
 
 from mcp.server import FastMCP
-from pydantic import BaseModel
 
 from .config import config
-from .vector_store import get_vector_store, close_vector_store
-from .llm_client import get_llm_client
 from .mcp_client import get_mcp_manager, cleanup_mcp_manager
 from .registry import MCPServerRegistry
 
+# The vector store (ollama, qdrant) and LLM (litellm) stacks are imported
+# inside the handlers that use them to keep server startup fast
+if TYPE_CHECKING:
+    from .vector_store import VectorStore
+
 # Configure logging
 logging.basicConfig(
     level=getattr(logging, config.log_level.upper()),
@@ -29,6 +35,22 @@ mcp = FastMCP(config.server_name)
 
 # Global instances
 registry: Optional[MCPServerRegistry] = None
+_vector_store: Optional["VectorStore"] = None
+
+# Recent get_intention results: key -> (monotonic time stored, result)
+_intention_cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+# Analyses in progress, so identical concurrent requests share one pipeline run
+_intention_inflight: Dict[str, "asyncio.Task[Dict[str, Any]]"] = {}
+_intention_lock = asyncio.Lock()
+
+
+async def _get_vector_store() -> "VectorStore":
+    """Return the vector store handle, resolving it on first use."""
+    global _vector_store
+    if _vector_store is None:
+        from .vector_store import get_vector_store
+        _vector_store = await get_vector_store()
+    return _vector_store
 
 
 async def initialize_services():
@@ -38,12 +60,15 @@ async def initialize_services():
     logger.info("Initializing MCP AWS YOLO services...")
     
     # Initialize vector store
-    await get_vector_store()
+    vector_store = await _get_vector_store()
     
     # Initialize MCP server registry
     registry = MCPServerRegistry(config.mcp_registry_file)
     await registry.load_registry()
     
+    # Search hits carry only point ids; server details come from the registry
+    vector_store.set_server_lookup(registry.get_server_by_point_id)
+    
     # Index servers in vector store
     # await registry.index_all_servers()
     
@@ -52,9 +77,13 @@ async def initialize_services():
 
 async def cleanup_services():
     """Cleanup all services."""
+    global _vector_store
     logger.info("Cleaning up services...")
     
+    _vector_store = None
     try:
+        from .vector_store import close_vector_store
+        
         await cleanup_mcp_manager()
         await close_vector_store()
         logger.info("Services cleaned up successfully")
@@ -81,24 +110,86 @@ async def get_intention(prompt: str, user_context: Optional[Dict[str, Any]] = No
             "available_tools": []
         }
     
+    # Reject noise prompts before paying for the LLM and vector search
+    if len(prompt.split()) < config.min_prompt_tokens:
+        return {
+            "error": f"Prompt too short (minimum {config.min_prompt_tokens} words)",
+            "server_id": None,
+            "available_tools": []
+        }
+    
+    start_time = time.monotonic()
+    key = _intention_cache_key(prompt, user_context)
+    
+    async with _intention_lock:
+        cached = _intention_cache.get(key)
+        if cached is not None and time.monotonic() - cached[0] < config.intention_cache_ttl:
+            _intention_cache.move_to_end(key)
+            logger.info(f"Using cached intention for prompt: '{prompt}'")
+            # Report this lookup's latency, not the original pipeline run's
+            result = copy.deepcopy(cached[1])
+            result["cached"] = True
+            result["execution_time"] = _elapsed(start_time)
+            return result
+        
+        task = _intention_inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(_analyze_intention(prompt, user_context))
+            _intention_inflight[key] = task
+            task.add_done_callback(lambda _: _intention_inflight.pop(key, None))
+    
+    # Shield so one caller being cancelled does not cancel the shared run
+    result = await asyncio.shield(task)
+    
+    if "error" not in result and config.intention_cache_size > 0:
+        async with _intention_lock:
+            _intention_cache[key] = (time.monotonic(), result)
+            _intention_cache.move_to_end(key)
+            while len(_intention_cache) > config.intention_cache_size:
+                _intention_cache.popitem(last=False)
+    
+    return copy.deepcopy(result)
+
+
+def _elapsed(start_time: float) -> float:
+    """Seconds since a time.monotonic() start mark."""
+    return time.monotonic() - start_time
+
+
+def _intention_cache_key(prompt: str, user_context: Optional[Dict[str, Any]]) -> str:
+    """Hash the prompt and user context into a cache key."""
+    context = json.dumps(user_context, sort_keys=True, default=str)
+    return hashlib.sha1(f"{prompt}\0{context}".encode()).hexdigest()
+
+
+async def _analyze_intention(prompt: str, user_context: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Run the full intent analysis and server selection pipeline."""
+    start_time = time.monotonic()
+    
     try:
-        start_time = time.time()
         logger.info(f"Analyzing user intention for prompt: '{prompt}'")
         
-        # Step 1: Use LLM to analyze user intent
+        # Steps 1 and 2 are independent: analyze user intent with the LLM
+        # while searching the vector store for candidate servers
+        from .llm_client import get_llm_client
+        
         llm_client = get_llm_client()
-        user_intent = await llm_client.analyze_user_intent(prompt)
+        vector_store = await _get_vector_store()
+        user_intent, candidates = await asyncio.gather(
+            llm_client.analyze_user_intent(prompt),
+            vector_store.search_servers(
+                query=prompt,
+                limit=config.search_limit,
+                score_threshold=config.similarity_threshold
+            ),
+            return_exceptions=True
+        )
+        for outcome in (user_intent, candidates):
+            if isinstance(outcome, BaseException):
+                raise outcome
         
         logger.debug(f"User intent analysis: {user_intent}")
         
-        # Step 2: Search vector store for candidate servers
-        vector_store = await get_vector_store()
-        candidates = await vector_store.search_servers(
-            query=prompt,
-            limit=config.search_limit,
-            score_threshold=config.similarity_threshold
-        )
-        
         if not candidates:
             # Try with expanded keywords from intent analysis
             expanded_query = f"{prompt} {' '.join(user_intent.get('keywords', []))}"
@@ -114,7 +205,7 @@ async def get_intention(prompt: str, user_context: Optional[Dict[str, Any]] = No
                 "server_id": None,
                 "available_tools": [],
                 "user_intent": user_intent,
-                "execution_time": time.time() - start_time
+                "execution_time": _elapsed(start_time)
             }
         
         logger.info(f"Found {len(candidates)} candidate servers")
@@ -131,7 +222,7 @@ async def get_intention(prompt: str, user_context: Optional[Dict[str, Any]] = No
                 "available_tools": [],
                 "candidates": [c.server_id for c in candidates],
                 "user_intent": user_intent,
-                "execution_time": time.time() - start_time
+                "execution_time": _elapsed(start_time)
             }
         
         # Step 4: Get detailed server configuration
@@ -145,7 +236,7 @@ async def get_intention(prompt: str, user_context: Optional[Dict[str, Any]] = No
                         "error": "Registry initialization failed",
                         "server_id": best_candidate.server_id,
                         "available_tools": [],
-                        "execution_time": time.time() - start_time
+                        "execution_time": _elapsed(start_time)
                     }
             except Exception as e:
                 logger.error(f"Failed to initialize services: {e}")
@@ -153,7 +244,7 @@ async def get_intention(prompt: str, user_context: Optional[Dict[str, Any]] = No
                     "error": f"Service initialization failed: {str(e)}",
                     "server_id": best_candidate.server_id,
                     "available_tools": [],
-                    "execution_time": time.time() - start_time
+                    "execution_time": _elapsed(start_time)
                 }
         
         server_config = registry.get_server_config(best_candidate.server_id)
@@ -162,7 +253,7 @@ async def get_intention(prompt: str, user_context: Optional[Dict[str, Any]] = No
                 "error": f"Server configuration not found: {best_candidate.server_id}",
                 "server_id": best_candidate.server_id,
                 "available_tools": [],
-                "execution_time": time.time() - start_time
+                "execution_time": _elapsed(start_time)
             }
         
         # Step 5: Connect to server and get live tools (if needed)
@@ -176,7 +267,7 @@ async def get_intention(prompt: str, user_context: Optional[Dict[str, Any]] = No
                 logger.warning(f"Dynamic tool discovery failed: {e}")
                 available_tools = best_candidate.tools
         
-        execution_time = time.time() - start_time
+        execution_time = _elapsed(start_time)
         confidence = best_candidate.metadata.get("llm_confidence", best_candidate.similarity_score)
         
         result = {
@@ -187,7 +278,6 @@ async def get_intention(prompt: str, user_context: Optional[Dict[str, Any]] = No
             "similarity_score": best_candidate.similarity_score,
             "available_tools": available_tools,
             "recommended_tool": best_candidate.metadata.get("recommended_tool"),
-            "llm_reasoning": best_candidate.metadata.get("llm_reasoning"),
             "user_intent": user_intent,
             "execution_time": execution_time,
             "next_step": "Use take_action(server_id, tool_name, parameters) to execute a tool"
@@ -202,7 +292,7 @@ async def get_intention(prompt: str, user_context: Optional[Dict[str, Any]] = No
             "error": f"Internal error: {str(e)}",
             "server_id": None,
             "available_tools": [],
-            "execution_time": time.time() - start_time if 'start_time' in locals() else 0
+            "execution_time": _elapsed(start_time)
         }
 
 
@@ -223,7 +313,7 @@ async def take_action(
     Returns:
         Tool execution results
     """
-    start_time = time.time()
+    start_time = time.monotonic()
     
     try:        
         logger.info(f"Executing tool '{tool_name}' on server '{server_id}'")
@@ -240,7 +330,7 @@ async def take_action(
                         "error": "Registry initialization failed",
                         "server_id": server_id,
                         "tool_name": tool_name,
-                        "execution_time": time.time() - start_time
+                        "execution_time": _elapsed(start_time)
                     }
             except Exception as e:
                 logger.error(f"Failed to initialize services: {e}")
@@ -249,7 +339,7 @@ async def take_action(
                     "error": f"Service initialization failed: {str(e)}",
                     "server_id": server_id,
                     "tool_name": tool_name,
-                    "execution_time": time.time() - start_time
+                    "execution_time": _elapsed(start_time)
                 }
         
         server_config = registry.get_server_config(server_id)
@@ -259,29 +349,24 @@ async def take_action(
                 "error": f"Server configuration not found: {server_id}",
                 "server_id": server_id,
                 "tool_name": tool_name,
-                "execution_time": time.time() - start_time
+                "execution_time": _elapsed(start_time)
             }
         
         # Get MCP manager
         mcp_manager = get_mcp_manager()
         
-        # Get available tools to validate and get schema using ephemeral connection
-        available_tools = await mcp_manager.list_tools(server_config)
-        tool_schema = None
+        # Validate the tool against the cached tool schemas
+        tool_schema = await mcp_manager.get_tool_schema(server_config, tool_name)
         
-        for tool in available_tools:
-            if tool["name"] == tool_name:
-                tool_schema = tool.get("input_schema", {})
-                break
-        
-        if not tool_schema:
+        if tool_schema is None:
+            available_tools = await mcp_manager.get_tools(server_config)
             return {
                 "success": False,
                 "error": f"Tool '{tool_name}' not found on server '{server_id}'",
                 "server_id": server_id,
                 "tool_name": tool_name,
                 "available_tools": [t["name"] for t in available_tools],
-                "execution_time": time.time() - start_time
+                "execution_time": _elapsed(start_time)
             }
         
         # Execute the tool using ephemeral connection
@@ -289,12 +374,12 @@ async def take_action(
             server_config, tool_name, parameters
         )
         
-        result["execution_time"] = time.time() - start_time
+        result["execution_time"] = _elapsed(start_time)
         logger.info(f"Tool execution completed in {result['execution_time']:.2f}s")
         return result
         
     except Exception as e:
-        execution_time = time.time() - start_time
+        execution_time = _elapsed(start_time)
         logger.exception(f"Error in take_action: {e}")
         return {
             "success": False,
@@ -333,6 +418,40 @@ async def list_available_servers() -> Dict[str, Any]:
         return {"error": str(e), "servers": []}
 
 
+async def _check_vector_store() -> Dict[str, Any]:
+    """Probe the vector store."""
+    vector_store = await _get_vector_store()
+    collection_info = await vector_store.get_collection_info()
+    return {"vector_store": "healthy", "vector_store_info": collection_info}
+
+
+async def _check_llm() -> Dict[str, Any]:
+    """Probe the LLM."""
+    from .llm_client import get_llm_client
+    
+    llm_client = get_llm_client()
+    await llm_client.analyze_user_intent("test prompt")
+    return {"llm": "healthy"}
+
+
+async def _check_registry() -> Dict[str, Any]:
+    """Probe the server registry."""
+    if registry is None:
+        return {"registry": "not initialized"}
+    servers = registry.list_servers()
+    return {"registry": "healthy", "registry_info": {"server_count": len(servers)}}
+
+
+async def _run_health_check(name: str, check) -> Dict[str, Any]:
+    """Run one health probe, reporting failures and timeouts as an error status."""
+    try:
+        return await asyncio.wait_for(check(), timeout=config.health_timeout)
+    except asyncio.TimeoutError:
+        return {name: f"error: timed out after {config.health_timeout}s"}
+    except Exception as e:
+        return {name: f"error: {str(e)}"}
+
+
 @mcp.tool()
 async def health_check() -> Dict[str, Any]:
     """Check health of all services."""
@@ -345,40 +464,21 @@ async def health_check() -> Dict[str, Any]:
         "timestamp": time.time()
     }
     
-    # Check vector store
-    try:
-        vector_store = await get_vector_store()
-        collection_info = await vector_store.get_collection_info()
-        status["vector_store"] = "healthy"
-        status["vector_store_info"] = collection_info
-    except Exception as e:
-        status["vector_store"] = f"error: {str(e)}"
-    
-    # Check LLM
-    try:
-        llm_client = get_llm_client()
-        await llm_client.analyze_user_intent("test prompt")
-        status["llm"] = "healthy"
-    except Exception as e:
-        status["llm"] = f"error: {str(e)}"
-    
-    # Check registry
-    try:
-        if registry is not None:
-            servers = registry.list_servers()
-            status["registry"] = "healthy"
-            status["registry_info"] = {"server_count": len(servers)}
-        else:
-            status["registry"] = "not initialized"
-    except Exception as e:
-        status["registry"] = f"error: {str(e)}"
+    # The probes are independent, so run them concurrently
+    results = await asyncio.gather(
+        _run_health_check("vector_store", _check_vector_store),
+        _run_health_check("llm", _check_llm),
+        _run_health_check("registry", _check_registry),
+    )
+    for result in results:
+        status.update(result)
     
     return status
 
 
 def main():
     """Main entry point."""
-    logger.info(f"Starting MCP AWS YOLO server v{config.__dict__}")
+    logger.info(f"Starting MCP AWS YOLO server v{config.model_dump()}")
     
     async def startup():
         await initialize_services()
@@ -390,6 +490,14 @@ def main():
     mcp.on_startup = startup
     mcp.on_shutdown = shutdown
     
+    # Use uvloop for the event loop when the optional extra is installed
+    try:
+        import uvloop
+        uvloop.install()
+        logger.info("Using uvloop event loop")
+    except ImportError:
+        pass
+    
     try:
         mcp.run()
     except KeyboardInterrupt:
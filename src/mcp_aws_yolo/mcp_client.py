@@ -5,63 +5,191 @@ import logging
 import asyncio
 import os
 import re
-from typing import Dict, Any, Optional, List
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, Any, Optional, List, Tuple, TypeVar
 from contextlib import AsyncExitStack
+from dataclasses import dataclass
 
+import anyio
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
+from mcp.shared.exceptions import McpError
+from mcp.types import INVALID_PARAMS, METHOD_NOT_FOUND, CallToolResult
 
 from .config import config
 
+# Faster JSON parsing when the optional extra is installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+_ENV_TEMPLATE_RE = re.compile(r'\{\{env:([^}]+)\}\}')
+
+# Seconds to wait for a pooled session to answer its health-check ping
+POOL_PING_TIMEOUT = 5.0
+
+
+# Resolved aws_config.json path and its parsed contents, reloaded on mtime change
+_AWS_CONFIG_PATH: Optional[str] = None
+_AWS_CONFIG_CACHE: Optional[Dict[str, str]] = None
+_AWS_CONFIG_MTIME: Optional[float] = None
+
+
+def _find_aws_config_path() -> Optional[str]:
+    """Locate aws_config.json once and remember its absolute path."""
+    global _AWS_CONFIG_PATH
+    
+    if _AWS_CONFIG_PATH is None:
+        # Try to find aws_config.json in the current working directory or project root
+        config_paths = [
+            "aws_config.json",
+            os.path.join(os.path.dirname(__file__), "..", "..", "aws_config.json"),
+            os.path.join(os.getcwd(), "aws_config.json")
+        ]
+        
+        for config_path in config_paths:
+            if os.path.exists(config_path):
+                _AWS_CONFIG_PATH = os.path.abspath(config_path)
+                break
+    
+    return _AWS_CONFIG_PATH
+
+
+def _aws_config_mtime() -> Optional[float]:
+    """Return the modification time of aws_config.json, or None if missing."""
+    config_path = _find_aws_config_path()
+    if config_path is None:
+        return None
+    try:
+        return os.stat(config_path).st_mtime
+    except OSError:
+        return None
+
+
+def invalidate_aws_config():
+    """Forget the cached AWS configuration and its resolved path."""
+    global _AWS_CONFIG_PATH, _AWS_CONFIG_CACHE, _AWS_CONFIG_MTIME
+    _AWS_CONFIG_PATH = None
+    _AWS_CONFIG_CACHE = None
+    _AWS_CONFIG_MTIME = None
+
 
 def _load_aws_config() -> Dict[str, str]:
-    """Load AWS configuration from aws_config.json."""
+    """Load AWS configuration from aws_config.json, cached until it changes."""
+    global _AWS_CONFIG_CACHE, _AWS_CONFIG_MTIME
     
-    # Try to find aws_config.json in the current working directory or project root
-    config_paths = [
-        "aws_config.json",
-        os.path.join(os.path.dirname(__file__), "..", "..", "aws_config.json"),
-        os.path.join(os.getcwd(), "aws_config.json")
-    ]
+    config_path = _find_aws_config_path()
+    if config_path is None:
+        logger.warning("Could not find aws_config.json, using empty configuration")
+        return {}
     
-    for config_path in config_paths:
-        if os.path.exists(config_path):
-            try:
-                with open(config_path, 'r') as f:
-                    aws_config = json.load(f)
-                logger.info(f"Loaded AWS config from: {config_path}")
-                return aws_config
-            except Exception as e:
-                logger.warning(f"Failed to load AWS config from {config_path}: {e}")
-                continue
+    mtime = _aws_config_mtime()
+    if _AWS_CONFIG_CACHE is not None and mtime == _AWS_CONFIG_MTIME:
+        return _AWS_CONFIG_CACHE
+    
+    try:
+        with open(config_path, 'rb') as f:
+            raw = f.read()
+        aws_config = orjson.loads(raw) if orjson is not None else json.loads(raw)
+        logger.info(f"Loaded AWS config from: {config_path}")
+    except Exception as e:
+        logger.warning(f"Failed to load AWS config from {config_path}: {e}")
+        return {}
     
-    logger.warning("Could not find aws_config.json, using empty configuration")
-    return {}
+    _AWS_CONFIG_CACHE = aws_config
+    _AWS_CONFIG_MTIME = mtime
+    return aws_config
+
+
+def _template_replacements(aws_config: Dict[str, str]) -> List[Tuple[str, str]]:
+    """Pair each aws_config key's {{env:key}} token with its value."""
+    return [('{{env:' + key + '}}', value) for key, value in aws_config.items()]
+
+
+def _replace_env_templates_in_string(
+    data: str,
+    aws_config: Dict[str, str],
+    replacements: List[Tuple[str, str]]
+) -> str:
+    """Replace {{env:param_name}} templates in a single string."""
+    
+    # Most strings contain no template at all
+    if '{{env:' not in data:
+        return data
+    
+    # Known keys are substituted with plain str.replace
+    for token, value in replacements:
+        if token in data:
+            logger.debug(f"Replacing {token} with '{value}'")
+            data = data.replace(token, value)
+    
+    if '{{env:' not in data:
+        return data
+    
+    # Remaining templates reference keys missing from aws_config
+    def replace_template(match):
+        param_name = match.group(1)
+        value = aws_config.get(param_name, "")
+        logger.debug(f"Replacing {{{{env:{param_name}}}}} with '{value}'")
+        return value
+    
+    return _ENV_TEMPLATE_RE.sub(replace_template, data)
 
 
 def _replace_env_templates(data: Any, aws_config: Dict[str, str]) -> Any:
-    """Recursively replace {{env:param_name}} templates with values from aws_config."""
+    """Replace {{env:param_name}} templates with values from aws_config.
+    
+    Walks nested dicts and lists with an explicit stack, building copies so
+    the input is left untouched.
+    """
+    
+    replacements = _template_replacements(aws_config)
     
     if isinstance(data, str):
-        # Replace {{env:param_name}} patterns
-        def replace_template(match):
-            param_name = match.group(1)
-            value = aws_config.get(param_name, "")
-            logger.debug(f"Replacing {{{{env:{param_name}}}}} with '{value}'")
-            return value
-        
-        return re.sub(r'\{\{env:([^}]+)\}\}', replace_template, data)
+        return _replace_env_templates_in_string(data, aws_config, replacements)
+    if not isinstance(data, (dict, list)):
+        return data
     
-    elif isinstance(data, list):
-        return [_replace_env_templates(item, aws_config) for item in data]
+    root = dict(data) if isinstance(data, dict) else list(data)
+    stack = [root]
+    while stack:
+        container = stack.pop()
+        keys = container.keys() if isinstance(container, dict) else range(len(container))
+        for key in keys:
+            value = container[key]
+            if isinstance(value, str):
+                container[key] = _replace_env_templates_in_string(value, aws_config, replacements)
+            elif isinstance(value, dict):
+                container[key] = value = dict(value)
+                stack.append(value)
+            elif isinstance(value, list):
+                container[key] = value = list(value)
+                stack.append(value)
     
-    elif isinstance(data, dict):
-        return {key: _replace_env_templates(value, aws_config) for key, value in data.items()}
+    return root
+
+
+@dataclass
+class _OwnedSession:
+    """A long-lived MCP session whose transport contexts belong to one task.
     
-    else:
-        return data
+    stdio_client and ClientSession enter anyio task groups that must be exited
+    by the task that entered them, so a dedicated owner task holds them open
+    and request handlers only borrow the session.
+    """
+    session: ClientSession
+    closing: asyncio.Event
+    task: "asyncio.Task[None]"
+    
+    async def close(self):
+        """Ask the owner task to exit the session's contexts and wait for it."""
+        self.closing.set()
+        await self.task
 
 
 class MCPClientManager:
@@ -69,10 +197,31 @@ class MCPClientManager:
     
     def __init__(self):
         self.active_sessions: Dict[str, ClientSession] = {}
-        self.session_stacks: Dict[str, AsyncExitStack] = {}
+        self.session_owners: Dict[str, _OwnedSession] = {}
+        # server_id -> (aws_config mtime, source server config, processed params)
+        self._params_cache: Dict[str, Tuple[Optional[float], Dict[str, Any], StdioServerParameters]] = {}
+        # server_id -> LIFO of idle pooled sessions; None marks a free slot
+        self._pools: Dict[str, asyncio.LifoQueue] = {}
+        # server_id -> {pooled session: owner task holding it open}
+        self._pool_owners: Dict[str, Dict[ClientSession, _OwnedSession]] = {}
+        # server_id -> parameters the pooled sessions were spawned with
+        self._pool_params: Dict[str, StdioServerParameters] = {}
+        # Bounds concurrent subprocess spawns and MCP handshakes
+        self._spawn_sem = asyncio.Semaphore(max(1, config.max_concurrent_mcp))
+        # server_id -> (monotonic fetch time, tool list)
+        self._tools_cache: Dict[str, Tuple[float, List[Dict[str, Any]]]] = {}
         
     async def _create_ephemeral_connection(self, server_config: Dict[str, Any]):
-        """Create a temporary connection to an MCP server for a single operation."""
+        """Create a temporary connection to an MCP server for a single operation.
+        
+        Processed parameters are cached per server until aws_config.json
+        changes or a different config object is passed for the server.
+        """
+        server_id = server_config["server_id"]
+        mtime = _aws_config_mtime()
+        cached = self._params_cache.get(server_id)
+        if cached is not None and cached[0] == mtime and cached[1] is server_config:
+            return cached[2]
         
         # Load AWS configuration
         aws_config = _load_aws_config()
@@ -96,70 +245,286 @@ class MCPClientManager:
         logger.debug(f"  Args: {processed_args}")
         logger.debug(f"  Env vars: {len(processed_env)} variables")
         
+        self._params_cache[server_id] = (mtime, server_config, server_params)
         return server_params
     
-    async def list_tools(self, server_config: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """List tools using an ephemeral connection."""
+    async def _start_session(self, server_config: Dict[str, Any], stack: AsyncExitStack) -> ClientSession:
+        """Spawn the server and initialize a session whose lifetime is bound to stack."""
         
         server_params = await self._create_ephemeral_connection(server_config)
+        logger.debug(f"Connecting to MCP server: {server_params.command} {server_params.args}")
+        
+        async with self._spawn_sem:
+            # Connect to server
+            read, write = await stack.enter_async_context(
+                stdio_client(server_params)
+            )
+            logger.debug("stdio_client connected successfully")
+            
+            # Initialize client session
+            session = await stack.enter_async_context(
+                ClientSession(read, write)
+            )
+            
+            # Initialize the session. This cannot be pipelined with the first
+            # request: the MCP lifecycle forbids other requests until the
+            # initialize response arrives and the initialized notification is
+            # sent, and servers built on the Python SDK reject them.
+            logger.debug("Initializing MCP session...")
+            await session.initialize()
+            logger.debug("MCP session initialized successfully")
+        
+        return session
+    
+    async def _run_owned_session(
+        self,
+        server_config: Dict[str, Any],
+        ready: "asyncio.Future[ClientSession]",
+        closing: asyncio.Event
+    ):
+        """Open a session, publish it through ready, and hold it until closing is set."""
+        
+        server_id = server_config["server_id"]
+        try:
+            async with AsyncExitStack() as stack:
+                session = await self._start_session(server_config, stack)
+                if not ready.done():
+                    ready.set_result(session)
+                await closing.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                logger.warning(f"Error closing session for {server_id}: {e}")
+        finally:
+            if not ready.done():
+                ready.cancel()
+    
+    async def _open_owned_session(self, server_config: Dict[str, Any]) -> _OwnedSession:
+        """Open a session in its own owner task so it can outlive the calling task."""
+        
+        ready: "asyncio.Future[ClientSession]" = asyncio.get_running_loop().create_future()
+        closing = asyncio.Event()
+        task = asyncio.create_task(self._run_owned_session(server_config, ready, closing))
+        try:
+            session = await ready
+        except asyncio.CancelledError:
+            # Let the owner tear the session down once it finishes opening
+            closing.set()
+            raise
+        return _OwnedSession(session=session, closing=closing, task=task)
+    
+    async def _acquire(self, server_config: Dict[str, Any]) -> ClientSession:
+        """Take an idle pooled session for the server, opening one if a slot is free.
+        
+        The pool is drained first if the server's processed parameters changed,
+        e.g. after an aws_config.json edit, so no session runs on stale settings.
+        """
+        
         server_id = server_config["server_id"]
+        params = await self._create_ephemeral_connection(server_config)
+        if server_id in self._pools and self._pool_params.get(server_id) != params:
+            logger.info(f"Parameters for MCP server {server_id} changed, closing its pooled sessions")
+            await self._close_pool(server_id)
+        
+        while True:
+            pool = self._pools.get(server_id)
+            if pool is None:
+                pool = self._pools[server_id] = asyncio.LifoQueue()
+                self._pool_owners[server_id] = {}
+                self._pool_params[server_id] = params
+                for _ in range(max(1, config.pool_size_per_server)):
+                    pool.put_nowait(None)
+            
+            session = await pool.get()
+            if self._pools.get(server_id) is pool:
+                break
+            # The pool was closed while waiting; wake the next waiter and use the new pool
+            pool.put_nowait(None)
+        
+        if session is not None:
+            return session
+        
+        try:
+            # Pooled sessions outlive the request that opens them, so each gets an owner task
+            owned = await self._open_owned_session(server_config)
+        except BaseException:
+            # Hand the slot back so a later caller can retry
+            pool.put_nowait(None)
+            raise
+        
+        owners = self._pool_owners.get(server_id)
+        if owners is None or self._pools.get(server_id) is not pool:
+            # The pool was closed while this session was opening
+            await owned.close()
+            raise RuntimeError(f"Session pool for {server_id} was closed")
+        
+        owners[owned.session] = owned
+        logger.info(f"Opened pooled session {len(owners)} for MCP server: {server_id}")
+        return owned.session
+    
+    async def _release(self, server_id: str, session: ClientSession):
+        """Return a session to its pool, discarding it if it fails a ping."""
+        
+        owners = self._pool_owners.get(server_id)
+        if owners is None or session not in owners:
+            # The pool was drained while the session was in use
+            return
+        
+        try:
+            await asyncio.wait_for(session.send_ping(), timeout=POOL_PING_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Pooled session for {server_id} failed health check, discarding: {e}")
+            owned = owners.pop(session)
+            self._pools[server_id].put_nowait(None)
+            await owned.close()
+            return
         
-        async with AsyncExitStack() as stack:
+        self._pools[server_id].put_nowait(session)
+    
+    async def _close_pool(self, server_id: str):
+        """Close every pooled session for a server, including ones in use."""
+        
+        pool = self._pools.pop(server_id, None)
+        self._pool_params.pop(server_id, None)
+        if pool is not None:
+            # Wake any caller blocked on the old pool so it moves to a new one
+            pool.put_nowait(None)
+        owners = self._pool_owners.pop(server_id, {})
+        # Each owner task exits its own contexts and logs any error
+        await asyncio.gather(*[owned.close() for owned in owners.values()])
+    
+    async def _with_session(
+        self,
+        server_config: Dict[str, Any],
+        operation: Callable[[ClientSession], Awaitable[T]]
+    ) -> T:
+        """Run operation on a pooled session.
+        
+        A session whose process died while idle fails before the request is
+        written, so it is discarded and the operation retried on another
+        session. Requests that may have reached the server are never retried.
+        """
+        
+        server_id = server_config["server_id"]
+        attempts = max(1, config.pool_size_per_server) + 1
+        for attempt in range(attempts):
+            session = await self._acquire(server_config)
             try:
-                # Connect to server
-                read, write = await stack.enter_async_context(
-                    stdio_client(server_params)
-                )
-                
-                # Initialize client session
-                session = await stack.enter_async_context(
-                    ClientSession(read, write)
-                )
-                
-                # Initialize the session
-                logger.debug("Initializing MCP session...")
-                await session.initialize()
-                logger.debug("MCP session initialized successfully")
-                
-                logger.debug(f"Listing tools for server: {server_id}")
-                tools_result = await session.list_tools()
-                
-                tools = []
-                for tool in tools_result.tools:
-                    tool_info = {
-                        "name": tool.name,
-                        "description": getattr(tool, 'description', 'No description available'),
-                        "input_schema": getattr(tool, 'inputSchema', {}),
-                    }
-                    
-                    # Add parameter details if available
-                    if hasattr(tool, 'inputSchema') and tool.inputSchema:
-                        schema = tool.inputSchema
-                        if isinstance(schema, dict):
-                            properties = schema.get('properties', {})
-                            required = schema.get('required', [])
-                            
-                            tool_info.update({
-                                "parameters": properties,
-                                "required_parameters": required,
-                                "parameter_types": {
-                                    param: prop.get('type', 'string') 
-                                    for param, prop in properties.items()
-                                },
-                                "parameter_descriptions": {
-                                    param: prop.get('description', 'No description')
-                                    for param, prop in properties.items()
-                                }
-                            })
-                    
-                    tools.append(tool_info)
-                    
-                logger.info(f"Found {len(tools)} tools on server {server_id}")
-                return tools
-                
-            except Exception as e:
-                logger.error(f"Failed to list tools for server {server_id}: {e}")
-                raise
+                return await operation(session)
+            except (anyio.ClosedResourceError, anyio.BrokenResourceError) as e:
+                if attempt == attempts - 1:
+                    raise
+                logger.warning(f"Pooled session for {server_id} is closed, retrying on another session: {e!r}")
+            finally:
+                # Dead sessions fail the release ping and are discarded
+                await self._release(server_id, session)
+        raise AssertionError("unreachable")
+    
+    async def list_tools(self, server_config: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """List tools, reusing a pooled session when possible."""
+        
+        server_id = server_config["server_id"]
+        
+        try:
+            logger.debug(f"Listing tools for server: {server_id}")
+            tools_result = await self._with_session(server_config, lambda session: session.list_tools())
+        except Exception as e:
+            logger.error(f"Failed to list tools for server {server_id}: {e}")
+            raise
+        
+        tools = []
+        for tool in tools_result.tools:
+            schema = getattr(tool, 'inputSchema', None) or {}
+            is_dict = isinstance(schema, dict)
+            properties = schema.get('properties', {}) if is_dict else {}
+            
+            # Collect parameter types and descriptions in a single pass
+            parameter_types = {}
+            parameter_descriptions = {}
+            for param, prop in properties.items():
+                parameter_types[param] = prop.get('type', 'string')
+                parameter_descriptions[param] = prop.get('description', 'No description')
+            
+            tools.append({
+                "name": tool.name,
+                "description": getattr(tool, 'description', 'No description available'),
+                "input_schema": schema,
+                "parameters": properties,
+                "required_parameters": schema.get('required', []) if is_dict else [],
+                "parameter_types": parameter_types,
+                "parameter_descriptions": parameter_descriptions
+            })
+        
+        self._tools_cache[server_id] = (time.monotonic(), tools)
+            
+        logger.info(f"Found {len(tools)} tools on server {server_id}")
+        return tools
+    
+    async def get_tools(self, server_config: Dict[str, Any], refresh: bool = False) -> List[Dict[str, Any]]:
+        """Get the server's tool list, served from a TTL cache when fresh."""
+        
+        cached = self._tools_cache.get(server_config["server_id"])
+        if not refresh and cached is not None and time.monotonic() - cached[0] < config.tools_cache_ttl:
+            return cached[1]
+        return await self.list_tools(server_config)
+    
+    async def get_tool_schema(self, server_config: Dict[str, Any], tool_name: str) -> Optional[Dict[str, Any]]:
+        """Get a tool's input schema, or None if the server has no such tool.
+        
+        A cached tool list that lacks the tool is refreshed once before giving up.
+        """
+        
+        def _find_schema(tools: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+            for tool in tools:
+                if tool["name"] == tool_name:
+                    return tool.get("input_schema") or {}
+            return None
+        
+        was_cached = server_config["server_id"] in self._tools_cache
+        schema = _find_schema(await self.get_tools(server_config))
+        if schema is None and was_cached:
+            schema = _find_schema(await self.get_tools(server_config, refresh=True))
+        return schema
+    
+    def invalidate_tools(self, server_id: str):
+        """Drop the cached tool list for a server."""
+        self._tools_cache.pop(server_id, None)
+    
+    async def execute_tool_stream(
+        self,
+        server_config: Dict[str, Any],
+        tool_name: str,
+        parameters: Dict[str, Any]
+    ) -> AsyncIterator[str]:
+        """Execute a tool and yield its content items one at a time.
+        
+        The session is released before the first item is yielded, so a slow
+        consumer never holds it. Errors are raised rather than returned.
+        """
+        
+        server_id = server_config["server_id"]
+        logger.info(f"Executing tool '{tool_name}' on server '{server_id}' with parameters: {parameters}")
+        
+        try:
+            # Use a pooled MCP session to call the tool
+            logger.debug(f"Calling tool '{tool_name}' with parameters: {parameters}")
+            tool_result = await self._with_session(
+                server_config,
+                lambda session: session.call_tool(name=tool_name, arguments=parameters)
+            )
+        except McpError as e:
+            if e.error.code in (INVALID_PARAMS, METHOD_NOT_FOUND):
+                # The cached schema may be out of date
+                self.invalidate_tools(server_id)
+            raise
+        
+        logger.info(f"Tool execution completed successfully")
+        logger.debug(f"Tool result: {tool_result}")
+        
+        # Convert items lazily (following mcp-registry pattern)
+        for content_item in getattr(tool_result, 'content', None) or ():
+            yield content_item.text if hasattr(content_item, 'text') else str(content_item)
     
     async def execute_tool(
         self, 
@@ -167,81 +532,44 @@ class MCPClientManager:
         tool_name: str, 
         parameters: Dict[str, Any]
     ) -> Dict[str, Any]:
-        """Execute a tool using an ephemeral connection."""
+        """Execute a tool, reusing a pooled session when possible."""
         
-        server_params = await self._create_ephemeral_connection(server_config)
         server_id = server_config["server_id"]
         
-        async with AsyncExitStack() as stack:
-            try:
-                logger.info(f"Executing tool '{tool_name}' on server '{server_id}' with parameters: {parameters}")
-                
-                # Connect to server
-                read, write = await stack.enter_async_context(
-                    stdio_client(server_params)
-                )
-                
-                # Initialize client session
-                session = await stack.enter_async_context(
-                    ClientSession(read, write)
-                )
-                
-                # Initialize the session
-                logger.debug("Initializing MCP session...")
-                await session.initialize()
-                logger.debug("MCP session initialized successfully")
-                
-                # Execute the tool with parameters
-                logger.debug(f"Calling tool '{tool_name}' with parameters: {parameters}")
-                
-                # Use the MCP session to call the tool
-                tool_result = await session.call_tool(
-                    name=tool_name,
-                    arguments=parameters
-                )
-                
-                logger.info(f"Tool execution completed successfully")
-                logger.debug(f"Tool result: {tool_result}")
-                
-                # Extract result content (following mcp-registry pattern)
-                result_content = None
-                if hasattr(tool_result, 'content') and tool_result.content:
-                    # Handle different content types
-                    if len(tool_result.content) == 1:
-                        content_item = tool_result.content[0]
-                        if hasattr(content_item, 'text'):
-                            result_content = content_item.text
-                        else:
-                            result_content = str(content_item)
-                    else:
-                        # Multiple content items
-                        result_content = [
-                            item.text if hasattr(item, 'text') else str(item)
-                            for item in tool_result.content
-                        ]
-                
-                # Format result
-                return {
-                    "success": True,
-                    "result": result_content,
-                    "tool_name": tool_name,
-                    "server_id": server_id,
-                    "parameters": parameters,
-                    "metadata": {
-                        "tool_result_type": str(type(tool_result)),
-                        "content_items": len(tool_result.content) if hasattr(tool_result, 'content') else 0
-                    }
-                }
-                
-            except Exception as e:
-                logger.error(f"Tool execution failed: {e}")
-                return {
-                    "success": False,
-                    "error": str(e),
-                    "tool_name": tool_name,
-                    "server_id": server_id,
-                    "parameters": parameters
+        try:
+            items = [
+                item async for item in self.execute_tool_stream(server_config, tool_name, parameters)
+            ]
+            
+            # A single content item is returned bare, multiple as a list
+            result_content = None
+            if len(items) == 1:
+                result_content = items[0]
+            elif items:
+                result_content = items
+            
+            # Format result
+            return {
+                "success": True,
+                "result": result_content,
+                "tool_name": tool_name,
+                "server_id": server_id,
+                "parameters": parameters,
+                "metadata": {
+                    "tool_result_type": str(CallToolResult),
+                    "content_items": len(items)
                 }
+            }
+            
+        except Exception as e:
+            logger.error(f"Tool execution failed: {e}")
+            return {
+                "success": False,
+                "error": str(e),
+                "tool_name": tool_name,
+                "server_id": server_id,
+                "parameters": parameters
+            }
         
     async def connect_to_server(self, server_config: Dict[str, Any]) -> str:
         """Connect to an MCP server and return session ID."""
@@ -262,103 +590,38 @@ class MCPClientManager:
                 await self.disconnect_server(server_id)
             
         try:
-            # Load AWS configuration
-            aws_config = _load_aws_config()
-            
-            # Process server configuration to replace env templates
-            processed_config = _replace_env_templates(server_config, aws_config)
-            
-            # Filter out empty arguments (common when templates resolve to empty strings)
-            processed_args = [arg for arg in processed_config.get("args", []) if arg.strip()]
-            
-            # Filter out empty environment variables
-            processed_env = {k: v for k, v in processed_config.get("env", {}).items() if v.strip()}
-            
-            logger.debug(f"Processed server config for {server_id}:")
-            logger.debug(f"  Command: {processed_config['command']}")
-            logger.debug(f"  Args: {processed_args}")
-            logger.debug(f"  Env vars: {len(processed_env)} variables")
-            
-            # Create server parameters with processed configuration
-            server_params = StdioServerParameters(
-                command=processed_config["command"],
-                args=processed_args,
-                env=processed_env
-            )
-            
-            # Create async exit stack for this session
-            exit_stack = AsyncExitStack()
-            self.session_stacks[server_id] = exit_stack
-            
-            logger.debug(f"Connecting to MCP server: {server_params.command} {server_params.args}")
-            
-            # Connect to server
-            read, write = await exit_stack.enter_async_context(
-                stdio_client(server_params)
-            )
-            logger.debug("stdio_client connected successfully")
-            
-            # Initialize client session
-            session = await exit_stack.enter_async_context(
-                ClientSession(read, write)
-            )
-            logger.debug("ClientSession created successfully")
-            
-            # Initialize the session
-            logger.debug("Initializing MCP session...")
-            await session.initialize()
-            logger.debug("MCP session initialized successfully")
+            # The owner task keeps the session open after this call returns
+            owned = await self._open_owned_session(server_config)
+            self.session_owners[server_id] = owned
             
             # Store active session
-            self.active_sessions[server_id] = session
+            self.active_sessions[server_id] = owned.session
             
             logger.info(f"Successfully connected to MCP server: {server_id}")
             return server_id
             
         except Exception as e:
             logger.error(f"Failed to connect to MCP server {server_id}: {e}")
-            # Cleanup on failure
-            if server_id in self.session_stacks:
-                try:
-                    await self.session_stacks[server_id].aclose()
-                except Exception as cleanup_error:
-                    logger.warning(f"Error during connection cleanup for {server_id}: {cleanup_error}")
-                del self.session_stacks[server_id]
-            
-            # Also cleanup any partial session
-            if server_id in self.active_sessions:
-                del self.active_sessions[server_id]
             raise
     
     async def disconnect_server(self, server_id: str):
         """Disconnect from an MCP server."""
         
-        if server_id in self.active_sessions:
-            try:
-                # Try to close the session gracefully first
-                session = self.active_sessions[server_id]
-                if hasattr(session, 'close'):
-                    await session.close()
-            except Exception as e:
-                logger.warning(f"Error closing session for {server_id}: {e}")
-            del self.active_sessions[server_id]
-            
-        if server_id in self.session_stacks:
-            try:
-                # Close the exit stack more carefully
-                stack = self.session_stacks[server_id]
-                await stack.aclose()
-            except Exception as e:
-                logger.warning(f"Error closing session stack for {server_id}: {e}")
-                # Don't re-raise - just log and continue cleanup
-            del self.session_stacks[server_id]
+        self.invalidate_tools(server_id)
+        await self._close_pool(server_id)
+        
+        self.active_sessions.pop(server_id, None)
+        owned = self.session_owners.pop(server_id, None)
+        if owned is not None:
+            # The owner task exits the contexts it entered and logs any error
+            await owned.close()
             
         logger.info(f"Disconnected from MCP server: {server_id}")
     
     async def disconnect_all(self):
         """Disconnect from all MCP servers."""
         
-        for server_id in list(self.active_sessions.keys()):
+        for server_id in set(self.active_sessions) | set(self._pools):
             await self.disconnect_server(server_id)
         
         logger.info("Disconnected from all MCP servers")
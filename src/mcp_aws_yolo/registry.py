@@ -1,15 +1,49 @@
 """MCP Server Registry for managing server configurations and metadata."""
 
+import asyncio
+import gzip
 import json
 import logging
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterator, List, Any, Optional
 from pathlib import Path
 
-from .vector_store import get_vector_store
 from .config import config
 
+# Faster JSON parsing and encoding when the optional extra is installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Incremental parsing for very large registries when the optional extra is installed
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
 logger = logging.getLogger(__name__)
 
+# Registry files at least this large are stream-parsed when ijson is available
+STREAM_PARSE_MIN_BYTES = 64 * 1024 * 1024
+
+
+def create_server_text(server_data: Dict[str, Any]) -> str:
+    """Create comprehensive text for embedding."""
+    name = server_data.get("name", "")
+    description = server_data.get("description", "")
+    tools_text = " ".join([
+        f"{tool.get('name', '')} {tool.get('description', '')}"
+        for tool in server_data.get("tools", [])
+    ])
+    capabilities_text = " ".join(server_data.get("capabilities", []))
+    
+    return "\n".join((
+        "Server: " + name,
+        "Purpose: " + description,
+        "Tools: " + tools_text,
+        "Capabilities: " + capabilities_text,
+    ))
+
 
 class MCPServerRegistry:
     """Registry for managing MCP server configurations."""
@@ -17,22 +51,30 @@ class MCPServerRegistry:
     def __init__(self, registry_file: str = None):
         self.registry_file = registry_file or config.mcp_registry_file
         self.servers: Dict[str, Dict[str, Any]] = {}
+        # server_id -> embedding text, built once when the server is added
+        self._embed_texts: Dict[str, str] = {}
+        # Vector store point id -> server, for hydrating search hits
+        self._by_point_id: Dict[Any, Dict[str, Any]] = {}
         
     async def load_registry(self):
-        """Load server registry from JSON file."""
+        """Load server registry from JSON file (gzip-compressed if it ends in .gz)."""
         try:
             registry_path = Path(self.registry_file)
             if not registry_path.exists():
                 logger.error(f"Registry file not found: {self.registry_file}")
                 raise FileNotFoundError(f"Registry file not found: {self.registry_file}")
             
-            with open(registry_path, 'r') as f:
-                data = json.load(f)
+            # Read and parse off the event loop
+            servers = await asyncio.to_thread(lambda: list(self._iter_servers(registry_path)))
             
             self.servers = {}
-            for server in data.get("servers", []):
+            self._embed_texts = {}
+            self._by_point_id = {}
+            for server in servers:
                 server_id = server["server_id"]
                 self.servers[server_id] = server
+                self._embed_texts[server_id] = create_server_text(server)
+                self._by_point_id[server.get("id")] = server
             
             logger.info(f"Loaded {len(self.servers)} servers from registry")
             
@@ -40,13 +82,32 @@ class MCPServerRegistry:
             logger.error(f"Failed to load registry: {e}")
             raise
     
+    def _iter_servers(self, registry_path: Path) -> Iterator[Dict[str, Any]]:
+        """Yield the registry's server entries, streaming large files."""
+        compressed = registry_path.suffix == ".gz"
+        if ijson is not None and registry_path.stat().st_size >= STREAM_PARSE_MIN_BYTES:
+            # Only one server is materialized at a time
+            with (gzip.open if compressed else open)(registry_path, 'rb') as f:
+                yield from ijson.items(f, 'servers.item', use_float=True)
+            return
+        
+        raw = registry_path.read_bytes()
+        if compressed:
+            raw = gzip.decompress(raw)
+        data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+        yield from data.get("servers", [])
+    
     async def index_all_servers(self):
         """Index all servers in the vector store."""
         try:
+            # Imported lazily so loading the registry does not pull in the vector stack
+            from .vector_store import get_vector_store
+            
             vector_store = await get_vector_store()
             
-            for server_id, server_data in self.servers.items():
-                await vector_store.index_mcp_server(server_data)
+            servers = list(self.servers.values())
+            texts = [self._embed_texts[server["server_id"]] for server in servers]
+            await vector_store.index_mcp_servers(servers, texts)
             
             logger.info(f"Indexed {len(self.servers)} servers in vector store")
             
@@ -58,6 +119,10 @@ class MCPServerRegistry:
         """Get server configuration by ID."""
         return self.servers.get(server_id)
     
+    def get_server_by_point_id(self, point_id: Any) -> Optional[Dict[str, Any]]:
+        """Get server configuration by its vector store point ID."""
+        return self._by_point_id.get(point_id)
+    
     def list_servers(self) -> List[Dict[str, Any]]:
         """List all servers."""
         return list(self.servers.values())
@@ -66,23 +131,39 @@ class MCPServerRegistry:
         """Add a new server to the registry."""
         server_id = server_data["server_id"]
         self.servers[server_id] = server_data
+        self._embed_texts[server_id] = create_server_text(server_data)
+        self._by_point_id[server_data.get("id")] = server_data
         logger.info(f"Added server to registry: {server_id}")
     
     def remove_server(self, server_id: str) -> bool:
         """Remove server from registry."""
         if server_id in self.servers:
-            del self.servers[server_id]
+            server = self.servers.pop(server_id)
+            del self._embed_texts[server_id]
+            self._by_point_id.pop(server.get("id"), None)
             logger.info(f"Removed server from registry: {server_id}")
             return True
         return False
     
     async def save_registry(self):
-        """Save registry to file."""
+        """Save registry to file (gzip-compressed if it ends in .gz)."""
         try:
             registry_data = {"servers": list(self.servers.values())}
-            with open(self.registry_file, 'w') as f:
-                json.dump(registry_data, f, indent=2)
+            # Encode and write off the event loop
+            await asyncio.to_thread(self._write_registry, registry_data)
             logger.info(f"Saved registry with {len(self.servers)} servers")
         except Exception as e:
             logger.error(f"Failed to save registry: {e}")
-            raise
\ No newline at end of file
+            raise
+    
+    def _write_registry(self, registry_data: Dict[str, Any]):
+        """Encode registry data as indented JSON and write it to the registry file."""
+        if orjson is not None:
+            raw = orjson.dumps(registry_data, option=orjson.OPT_INDENT_2)
+        else:
+            raw = json.dumps(registry_data, indent=2).encode()
+        
+        registry_path = Path(self.registry_file)
+        if registry_path.suffix == ".gz":
+            raw = gzip.compress(raw)
+        registry_path.write_bytes(raw)
\ No newline at end of file
@@ -1,17 +1,28 @@
 """Vector store service for MCP server similarity search."""
 
+import asyncio
+import hashlib
+import json
 import logging
-from typing import Dict, List, Optional, Any
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass
+from pathlib import Path
 
+import httpx
+import numpy as np
 import ollama
 from qdrant_client import AsyncQdrantClient, models
 from qdrant_client.http.exceptions import ResponseHandlingException
 
 from .config import config
+from .registry import create_server_text
 
 logger = logging.getLogger(__name__)
 
+# Segment size (KB of vectors) below which Qdrant skips building the HNSW index
+INDEXING_THRESHOLD_KB = 20000
+
 
 @dataclass
 class MCPServerCandidate:
@@ -25,30 +36,85 @@ class MCPServerCandidate:
     metadata: Dict[str, Any]
 
 
+def create_qdrant_client() -> AsyncQdrantClient:
+    """Create a Qdrant client, using gRPC when preferred."""
+    return AsyncQdrantClient(
+        url=config.qdrant_url,
+        api_key=config.qdrant_api_key,
+        prefer_grpc=config.qdrant_prefer_grpc,
+        grpc_port=config.qdrant_grpc_port,
+        timeout=30
+    )
+
+
+def _hnsw_params(vector_count_hint: Optional[int]) -> Tuple[int, int]:
+    """Pick HNSW (m, ef_construct) for the expected number of vectors."""
+    if vector_count_hint is None or vector_count_hint < 100_000:
+        return 16, 64
+    if vector_count_hint < 1_000_000:
+        return 24, 100
+    return 32, 128
+
+
+def _embedding_cache_key(text: str) -> str:
+    """Content hash identifying a text's embedding under the configured model."""
+    return hashlib.blake2b(
+        f"{config.embedding_model}\0{text}".encode(), digest_size=16
+    ).hexdigest()
+
+
+def _pack_batches(indices: List[int], lengths: List[int], budget: int, max_items: int) -> List[List[int]]:
+    """Greedily group indices, in order, into batches bounded by total length and size.
+    
+    An item longer than the budget gets a batch of its own.
+    """
+    batches: List[List[int]] = []
+    current: List[int] = []
+    current_length = 0
+    for i in indices:
+        if current and (current_length + lengths[i] > budget or len(current) >= max_items):
+            batches.append(current)
+            current = []
+            current_length = 0
+        current.append(i)
+        current_length += lengths[i]
+    if current:
+        batches.append(current)
+    return batches
+
+
 class VectorStore:
     """Vector store for MCP server embeddings and search."""
     
     def __init__(self):
         self.client: Optional[AsyncQdrantClient] = None
-        self.ollama_client = ollama.AsyncClient()
+        self._owns_client = True
+        # One pooled client for every embedding request this store makes
+        self.ollama_client = ollama.AsyncClient(
+            timeout=httpx.Timeout(30.0),
+            limits=httpx.Limits(
+                max_connections=config.embedding_max_connections,
+                max_keepalive_connections=config.embedding_max_connections
+            )
+        )
         self._embedding_dim: Optional[int] = None
+        # Cleared when the Ollama server predates the batch /api/embed endpoint
+        self._batch_embed_supported = True
+        # blake2b(model, server text) -> embedding, loaded on first bulk index
+        self._emb_cache: Optional[Dict[str, np.ndarray]] = None
+        # Normalized search query -> embedding, least recently used first
+        self._query_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        # Resolves a point id to its server config; without it payloads come from Qdrant
+        self._server_lookup: Optional[Callable[[Any], Optional[Dict[str, Any]]]] = None
         
     async def initialize(self):
         """Initialize vector store and embedding model."""
         try:
             # Initialize Qdrant client
-            self.client = AsyncQdrantClient(
-                url=config.qdrant_url,
-                api_key=config.qdrant_api_key,
-                timeout=30.0
-            )
-            
-            # Test Ollama connection and get embedding dimension
-            logger.info(f"Testing Ollama embedding model: {config.embedding_model}")
-            test_embedding = await self._create_embedding("test")
-            self._embedding_dim = len(test_embedding)
+            self.client = create_qdrant_client()
             
-            logger.info(f"Ollama embedding model loaded: {config.embedding_model} (dim: {self._embedding_dim})")
+            # Get embedding dimension, probing Ollama only for unknown models
+            await self._resolve_embedding_dim()
             
             # Use existing collection (setup.py should have created it)
             await self._verify_collection()
@@ -59,25 +125,29 @@ class VectorStore:
             logger.error(f"Failed to initialize vector store: {e}")
             raise
             
-    async def _initialize_for_setup(self):
-        """Initialize vector store for setup.py (creates fresh collection)."""
+    async def _initialize_for_setup(
+        self,
+        client: Optional[AsyncQdrantClient] = None,
+        vector_count_hint: Optional[int] = None
+    ):
+        """Initialize vector store for setup.py (creates fresh collection).
+        
+        If a client is given it is reused and left open on close().
+        """
         try:
             # Initialize Qdrant client
-            self.client = AsyncQdrantClient(
-                url=config.qdrant_url,
-                api_key=config.qdrant_api_key,
-                timeout=30.0
-            )
+            if client is not None:
+                self.client = client
+                self._owns_client = False
+            else:
+                self.client = create_qdrant_client()
             
-            # Test Ollama connection and get embedding dimension
-            logger.info(f"Testing Ollama embedding model: {config.embedding_model}")
-            test_embedding = await self._create_embedding("test")
-            self._embedding_dim = len(test_embedding)
-            
-            logger.info(f"Ollama embedding model loaded: {config.embedding_model} (dim: {self._embedding_dim})")
+            # Test Ollama connection and get embedding dimension; the collection
+            # is sized from it, so never trust a cached value here
+            await self._resolve_embedding_dim(probe=True)
             
             # Create fresh collection
-            await self._ensure_collection()
+            await self._ensure_collection(vector_count_hint)
             
             logger.info("Vector store initialized successfully for setup")
             
@@ -85,9 +155,43 @@ class VectorStore:
             logger.error(f"Failed to initialize vector store for setup: {e}")
             raise
             
+    async def _resolve_embedding_dim(self, probe: bool = False):
+        """Set the embedding dimension from the dimension cache file or a test embedding."""
+        cache_path = Path(config.embedding_dim_cache_file)
+        cached: Dict[str, int] = {}
+        if cache_path.exists():
+            try:
+                with open(cache_path, 'r') as f:
+                    cached = json.load(f)
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable embedding dimension cache {cache_path}: {e}")
+        
+        if not probe and config.embedding_model in cached:
+            self._embedding_dim = int(cached[config.embedding_model])
+            logger.info(f"Using cached embedding dimension for {config.embedding_model} (dim: {self._embedding_dim})")
+            return
+        
+        logger.info(f"Testing Ollama embedding model: {config.embedding_model}")
+        test_embedding = await self._create_embedding("test")
+        self._embedding_dim = len(test_embedding)
+        
+        logger.info(f"Ollama embedding model loaded: {config.embedding_model} (dim: {self._embedding_dim})")
+        
+        if cached.get(config.embedding_model) != self._embedding_dim:
+            cached[config.embedding_model] = self._embedding_dim
+            try:
+                with open(cache_path, 'w') as f:
+                    json.dump(cached, f)
+            except Exception as e:
+                logger.warning(f"Failed to save embedding dimension cache: {e}")
+    
+    def set_server_lookup(self, lookup: Callable[[Any], Optional[Dict[str, Any]]]):
+        """Hydrate search hits from an in-memory registry instead of Qdrant payloads."""
+        self._server_lookup = lookup
+            
     async def close(self):
         """Close vector store connections."""
-        if self.client:
+        if self.client and self._owns_client:
             await self.client.close()
             
     async def _verify_collection(self):
@@ -114,12 +218,16 @@ class VectorStore:
             logger.error(f"Failed to verify collection: {e}")
             raise
             
-    async def _ensure_collection(self):
-        """Ensure the MCP servers collection exists (used in setup.py)."""
+    async def _ensure_collection(self, vector_count_hint: Optional[int] = None):
+        """Ensure the MCP servers collection exists (used in setup.py).
+        
+        HNSW parameters are tuned for vector_count_hint vectors when it is known.
+        """
         if not self.client or not self._embedding_dim:
             raise RuntimeError("Vector store not initialized")
             
         collection_name = config.vector_collection_name
+        m, ef_construct = _hnsw_params(vector_count_hint)
         
         try:
             # Create collection (setup.py will delete any existing one first)
@@ -129,43 +237,95 @@ class VectorStore:
                     size=self._embedding_dim,
                     distance=models.Distance.COSINE,
                 ),
+                hnsw_config=models.HnswConfigDiff(m=m, ef_construct=ef_construct),
+                optimizers_config=models.OptimizersConfigDiff(indexing_threshold=INDEXING_THRESHOLD_KB),
+                # int8 copies of the vectors for scoring; originals are kept for rescoring
+                quantization_config=models.ScalarQuantization(
+                    scalar=models.ScalarQuantizationConfig(
+                        type=models.ScalarType.INT8,
+                        quantile=0.99,
+                        always_ram=True,
+                    ),
+                ),
+            )
+            logger.info(
+                f"Created Qdrant collection: {collection_name} "
+                f"(dim: {self._embedding_dim}, m: {m}, ef_construct: {ef_construct})"
             )
-            logger.info(f"Created Qdrant collection: {collection_name} (dim: {self._embedding_dim})")
                 
         except ResponseHandlingException as e:
             logger.error(f"Failed to create collection: {e}")
             raise
             
-    async def _create_embedding(self, text: str) -> List[float]:
-        """Create embedding for text using Ollama."""
+    async def _create_embeddings_batch(self, texts: List[str]) -> np.ndarray:
+        """Create embeddings for several texts in one Ollama /api/embed request.
+        
+        Returns a float32 array with one row per text. Falls back to concurrent per-text requests on servers without /api/embed.
+        """
+        if not self._batch_embed_supported:
+            return await self._create_embeddings_legacy(texts)
+        
         try:
-            response = await self.ollama_client.embeddings(
+            response = await self.ollama_client.embed(
                 model=config.embedding_model,
-                prompt=text
+                input=texts
             )
-            return response['embedding']
+            return np.asarray(response['embeddings'], dtype=np.float32)
+        except ollama.ResponseError as e:
+            if e.status_code != 404:
+                logger.error(f"Failed to create embeddings with Ollama: {e}")
+                raise RuntimeError(f"Ollama embedding failed: {e}")
+            # Either an old server or a missing model; the legacy call tells them apart
+            embeddings = await self._create_embeddings_legacy(texts)
+            logger.warning("Ollama server has no /api/embed endpoint, using per-text embeddings")
+            self._batch_embed_supported = False
+            return embeddings
         except Exception as e:
-            logger.error(f"Failed to create embedding with Ollama: {e}")
+            logger.error(f"Failed to create embeddings with Ollama: {e}")
             raise RuntimeError(f"Ollama embedding failed: {e}")
+    
+    async def _create_embeddings_legacy(self, texts: List[str]) -> np.ndarray:
+        """Create embeddings through the legacy single-text endpoint, bounded by index_concurrency."""
+        semaphore = asyncio.Semaphore(max(1, config.index_concurrency))
+        
+        async def _embed(text: str) -> List[float]:
+            async with semaphore:
+                response = await self.ollama_client.embeddings(
+                    model=config.embedding_model,
+                    prompt=text
+                )
+                return response['embedding']
+        
+        try:
+            embeddings = await asyncio.gather(*[_embed(text) for text in texts])
+            return np.asarray(embeddings, dtype=np.float32)
+        except Exception as e:
+            logger.error(f"Failed to create embeddings with Ollama: {e}")
+            raise RuntimeError(f"Ollama embedding failed: {e}")
+    
+    async def _create_embedding(self, text: str) -> np.ndarray:
+        """Create embedding for text using Ollama."""
+        embeddings = await self._create_embeddings_batch([text])
+        return embeddings[0]
         
     def _create_server_text(self, server_data: Dict[str, Any]) -> str:
         """Create comprehensive text for embedding."""
-        name = server_data.get("name", "")
-        description = server_data.get("description", "")
-        tools_text = " ".join([
-            f"{tool.get('name', '')} {tool.get('description', '')}"
-            for tool in server_data.get("tools", [])
-        ])
-        capabilities_text = " ".join(server_data.get("capabilities", []))
-        
-        server_text = f"""
-        Server: {name}
-        Purpose: {description}
-        Tools: {tools_text}
-        Capabilities: {capabilities_text}
-        """.strip()
-        
-        return server_text
+        return create_server_text(server_data)
+        
+    async def _create_server_point(self, server_data: Dict[str, Any]) -> models.PointStruct:
+        """Embed a server and build its Qdrant point."""
+        # Create server text for embedding
+        server_text = self._create_server_text(server_data)
+        
+        # Create embedding
+        embedding = await self._create_embedding(server_text)
+        
+        # Create Qdrant point
+        return models.PointStruct(
+            id=server_data["id"],
+            vector=embedding.tolist(),
+            payload=server_data
+        )
         
     async def index_mcp_server(self, server_data: Dict[str, Any]):
         """Index a single MCP server."""
@@ -173,18 +333,7 @@ class VectorStore:
             raise RuntimeError("Vector store not initialized")
             
         try:
-            # Create server text for embedding
-            server_text = self._create_server_text(server_data)
-            
-            # Create embedding
-            embedding = await self._create_embedding(server_text)
-            
-            # Create Qdrant point
-            point = models.PointStruct(
-                id=server_data["id"],
-                vector=embedding,
-                payload=server_data
-            )
+            point = await self._create_server_point(server_data)
             
             # Upsert point
             await self.client.upsert(
@@ -198,6 +347,115 @@ class VectorStore:
             logger.error(f"Failed to index server {server_data.get('server_id', 'unknown')}: {e}")
             raise
             
+    def _load_embedding_cache(self) -> Dict[str, np.ndarray]:
+        """Load the server embedding cache file, once."""
+        if self._emb_cache is None:
+            self._emb_cache = {}
+            cache_path = Path(config.embedding_cache_file)
+            if cache_path.exists():
+                try:
+                    with open(cache_path, 'r') as f:
+                        self._emb_cache = {
+                            key: np.asarray(vector, dtype=np.float32)
+                            for key, vector in json.load(f).items()
+                        }
+                    logger.info(f"Loaded {len(self._emb_cache)} cached embeddings from {cache_path}")
+                except Exception as e:
+                    logger.warning(f"Ignoring unreadable embedding cache {cache_path}: {e}")
+        return self._emb_cache
+    
+    def _save_embedding_cache(self, keys: List[str]):
+        """Write the cache entries for the given keys, dropping everything else."""
+        cache = self._load_embedding_cache()
+        self._emb_cache = {key: cache[key] for key in keys if key in cache}
+        try:
+            with open(config.embedding_cache_file, 'w') as f:
+                json.dump({key: vector.tolist() for key, vector in self._emb_cache.items()}, f)
+        except Exception as e:
+            logger.warning(f"Failed to save embedding cache: {e}")
+    
+    async def _set_indexing_threshold(self, threshold_kb: int):
+        """Change the collection's indexing threshold; 0 disables HNSW indexing."""
+        try:
+            await self.client.update_collection(
+                collection_name=config.vector_collection_name,
+                optimizers_config=models.OptimizersConfigDiff(indexing_threshold=threshold_kb)
+            )
+        except Exception as e:
+            logger.warning(f"Failed to set indexing threshold to {threshold_kb}: {e}")
+    
+    async def index_mcp_servers(self, server_datas: List[Dict[str, Any]], texts: Optional[List[str]] = None):
+        """Index many MCP servers with batched embedding calls and bulk upserts.
+        
+        texts, when given, are the servers' precomputed embedding texts. Servers
+        whose text is unchanged since the last run reuse their cached embedding
+        instead of calling Ollama.
+        """
+        if not self.client:
+            raise RuntimeError("Vector store not initialized")
+        
+        if texts is None:
+            texts = [self._create_server_text(server_data) for server_data in server_datas]
+        lengths = [len(text) for text in texts]
+        keys = [_embedding_cache_key(text) for text in texts]
+        cache = self._load_embedding_cache()
+        misses = [i for i, key in enumerate(keys) if key not in cache]
+        
+        # Batch similar-length texts together so the model pads less; each
+        # embedding is stored under its own key, so order does not matter
+        order = sorted(misses, key=lengths.__getitem__)
+        embed_batches = _pack_batches(
+            order,
+            lengths,
+            config.embed_token_budget,
+            config.embed_max_batch
+        )
+        
+        try:
+            for batch in embed_batches:
+                try:
+                    embeddings = await self._create_embeddings_batch([texts[i] for i in batch])
+                except Exception as e:
+                    logger.error(f"Failed to embed {len(batch)} MCP servers: {e}")
+                    raise
+                for i, embedding in zip(batch, embeddings):
+                    cache[keys[i]] = embedding
+        finally:
+            # Keep what was embedded even if a later batch fails
+            self._save_embedding_cache(keys)
+        
+        # Payloads scale with server text, so the same budget bounds upserts
+        upsert_batches = _pack_batches(
+            list(range(len(texts))),
+            lengths,
+            config.embed_token_budget,
+            config.embed_max_batch
+        )
+        
+        # Pause HNSW indexing during the load so the graph is built once at the end
+        await self._set_indexing_threshold(0)
+        try:
+            for n, batch in enumerate(upsert_batches, 1):
+                points = [
+                    models.PointStruct(id=server_datas[i]["id"], vector=cache[keys[i]].tolist(), payload=server_datas[i])
+                    for i in batch
+                ]
+                
+                # Only wait for the last batch; Qdrant applies writes in order,
+                # so every point is stored once it is acknowledged
+                await self.client.upsert(
+                    collection_name=config.vector_collection_name,
+                    points=points,
+                    wait=n == len(upsert_batches)
+                )
+        finally:
+            await self._set_indexing_threshold(INDEXING_THRESHOLD_KB)
+        
+        logger.info(
+            f"Indexed {len(texts)} MCP servers "
+            f"({len(texts) - len(misses)} cached, {len(misses)} embedded in {len(embed_batches)} batches)"
+        )
+            
     async def get_collection_info(self) -> Dict[str, Any]:
         """Get information about the collection."""
         if not self.client:
@@ -221,6 +479,30 @@ class VectorStore:
                 "status": "unknown"
             }
 
+    async def _embed_queries(self, queries: List[str]) -> List[np.ndarray]:
+        """Embed search queries, reusing recent embeddings from an LRU cache."""
+        keys = [query.strip().lower() for query in queries]
+        
+        # Embed each uncached query once, even if it repeats in the batch
+        resolved: Dict[str, np.ndarray] = {}
+        misses: Dict[str, str] = {}
+        for key, query in zip(keys, queries):
+            if key in self._query_cache:
+                self._query_cache.move_to_end(key)
+                resolved[key] = self._query_cache[key]
+            elif key not in misses:
+                misses[key] = query
+        
+        if misses:
+            embeddings = await self._create_embeddings_batch(list(misses.values()))
+            fresh = dict(zip(misses, embeddings))
+            resolved.update(fresh)
+            self._query_cache.update(fresh)
+            while len(self._query_cache) > max(0, config.query_cache_size):
+                self._query_cache.popitem(last=False)
+        
+        return [resolved[key] for key in keys]
+
     async def search_servers(
         self, 
         query: str, 
@@ -228,68 +510,112 @@ class VectorStore:
         score_threshold: float = None
     ) -> List[MCPServerCandidate]:
         """Search for relevant MCP servers."""
+        results = await self.search_servers_batch([query], limit, score_threshold)
+        return results[0]
+    
+    async def search_servers_batch(
+        self,
+        queries: List[str],
+        limit: int = None,
+        score_threshold: float = None
+    ) -> List[List[MCPServerCandidate]]:
+        """Search for relevant MCP servers for several queries in one request.
+        
+        Returns one candidate list per query, in the same order.
+        """
         if not self.client:
             raise RuntimeError("Vector store not initialized")
             
         limit = limit or config.search_limit
         score_threshold = score_threshold or config.similarity_threshold
         
+        # A wider candidate queue than the result count keeps HNSW recall up
+        search_params = models.SearchParams(
+            hnsw_ef=config.hnsw_ef or max(64, 4 * limit),
+            exact=False,
+            # Oversample on the int8 vectors, then rescore the survivors in full precision
+            quantization=models.QuantizationSearchParams(rescore=True, oversampling=2.0)
+        )
+        
         try:
-            # Create query embedding
-            query_embedding = await self._create_embedding(query)
+            # Create query embeddings
+            query_embeddings = await self._embed_queries(queries)
             
-            # Search in Qdrant
-            search_results = await self.client.search(
+            # Search in Qdrant with a single batched request; payloads are
+            # only fetched when there is no registry to hydrate hits from
+            lookup = self._server_lookup
+            batch_responses = await self.client.query_batch_points(
                 collection_name=config.vector_collection_name,
-                query_vector=query_embedding,
-                limit=limit,
-                score_threshold=score_threshold,
-                with_payload=True,
-                with_vectors=False
+                requests=[
+                    models.QueryRequest(
+                        query=query_embedding.tolist(),
+                        limit=limit,
+                        score_threshold=score_threshold,
+                        with_payload=lookup is None,
+                        with_vector=False,
+                        params=search_params
+                    )
+                    for query_embedding in query_embeddings
+                ]
             )
             
             # Convert to MCPServerCandidate objects
-            candidates = []
-            for result in search_results:
-                payload = result.payload or {}
-                candidate = MCPServerCandidate(
-                    server_id=payload.get("server_id", "unknown"),
-                    name=payload.get("name", "Unknown Server"),
-                    description=payload.get("description", ""),
-                    similarity_score=result.score,
-                    tools=payload.get("tools", []),
-                    capabilities=payload.get("capabilities", []),
-                    metadata=payload
-                )
-                candidates.append(candidate)
-                
-            logger.info(f"Found {len(candidates)} server candidates for query: {query}")
-            return candidates
+            all_candidates = []
+            for query, response in zip(queries, batch_responses):
+                candidates = []
+                for result in response.points:
+                    payload = (lookup(result.id) if lookup is not None else result.payload) or {}
+                    candidate = MCPServerCandidate(
+                        server_id=payload.get("server_id", "unknown"),
+                        name=payload.get("name", "Unknown Server"),
+                        description=payload.get("description", ""),
+                        similarity_score=result.score,
+                        tools=payload.get("tools", []),
+                        capabilities=payload.get("capabilities", []),
+                        # Copied so per-request keys never land in the registry's server dict
+                        metadata=dict(payload)
+                    )
+                    candidates.append(candidate)
+                    
+                logger.info(f"Found {len(candidates)} server candidates for query: {query}")
+                all_candidates.append(candidates)
+            return all_candidates
             
         except Exception as e:
             logger.error(f"Vector search failed: {e}")
-            return []
+            return [[] for _ in queries]
 
 
 # Global instance
 _vector_store: Optional[VectorStore] = None
+# Serializes first-time initialization so concurrent callers share one instance
+_vector_store_lock = asyncio.Lock()
 
 
 async def get_vector_store() -> VectorStore:
     """Get or create global vector store instance."""
     global _vector_store
     if _vector_store is None:
-        _vector_store = VectorStore()
-        await _vector_store.initialize()
+        async with _vector_store_lock:
+            if _vector_store is None:
+                vector_store = VectorStore()
+                await vector_store.initialize()
+                _vector_store = vector_store
     return _vector_store
 
 
-async def get_vector_store_for_setup() -> VectorStore:
+async def get_vector_store_for_setup(
+    client: Optional[AsyncQdrantClient] = None,
+    vector_count_hint: Optional[int] = None
+) -> VectorStore:
     """Get vector store instance for setup.py (creates fresh collection)."""
     global _vector_store
     if _vector_store is None:
-        _vector_store = VectorStore()
-        await _vector_store._initialize_for_setup()
+        async with _vector_store_lock:
+            if _vector_store is None:
+                vector_store = VectorStore()
+                await vector_store._initialize_for_setup(client=client, vector_count_hint=vector_count_hint)
+                _vector_store = vector_store
     return _vector_store
 
 